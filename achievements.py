@@ -0,0 +1,56 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+# An achievement unlocks once the user's value for `stat` reaches `threshold`
+Achievement = namedtuple('Achievement', ['id', 'name', 'stat', 'threshold'])
+
+
+class AchievementEngine:
+    """
+    Achievement rules indexed by the stat they depend on.
+
+    Rules for each stat are sorted by threshold, so finding the rules a change
+    of value unlocks is a bisect instead of a scan over every achievement.
+    """
+
+    def __init__(self, achievements):
+        self.achievements = {achievement.id: achievement for achievement in achievements}
+        self._rules = {}
+        for achievement in sorted(achievements, key=lambda a: a.threshold):
+            thresholds, rules = self._rules.setdefault(achievement.stat, ([], []))
+            thresholds.append(achievement.threshold)
+            rules.append(achievement)
+
+    @property
+    def stats(self):
+        """Names of the stats the rules depend on"""
+        return list(self._rules)
+
+    def get(self, achievement_id):
+        return self.achievements.get(achievement_id)
+
+    def reached(self, stats):
+        """
+        All achievements whose threshold is reached by the given stats
+        Args:
+            stats: Dict of stat name -> current value
+        """
+        reached = []
+        for stat, (thresholds, rules) in self._rules.items():
+            reached.extend(rules[:bisect_right(thresholds, stats.get(stat) or 0)])
+        return reached
+
+    def crossed(self, previous, stats):
+        """
+        Achievements whose threshold was crossed going from previous to stats
+        Args:
+            previous: Dict of stat name -> value before the change
+            stats: Dict of stat name -> value after the change
+        """
+        crossed = []
+        for stat, (thresholds, rules) in self._rules.items():
+            old_value, new_value = previous.get(stat) or 0, stats.get(stat) or 0
+            if new_value <= old_value:
+                continue
+            crossed.extend(rules[bisect_right(thresholds, old_value):bisect_right(thresholds, new_value)])
+        return crossed
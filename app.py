@@ -1,30 +1,86 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import func, case, and_, or_
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, date, timedelta
 import random
 import json
+import base64
+import hashlib
 import os
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
-import google.generativeai as genai
+import click
+from levels import table_curve, exponential_curve
+from achievements import Achievement, AchievementEngine
+from description_cache import TTLCache, SQLDescriptionStore, DescriptionCache, cache_key, config_hash
+from concurrency import SlotLimiter, SingleFlight, LeaderLock
+from llm import create_backend
+from storage import database_uri, engine_options, install_sqlite_pragmas
+from leaderboard import create_leaderboard
+from progress_events import create_progress_broker
+from fragment_cache import create_fragment_cache
+from metrics import create_metrics
+from streaks import DEFAULT_TIMEZONE, DECAY_INTERVAL_MINUTES, validate_timezone, utc_offset_minutes, local_date, decay_cutoffs
+from quest_records import QUEST_RECORD_FIELDS, QuestRecord, format_datetime, decode_tags
+from fast_json import FastJSONProvider
+from quest_io import IMPORT_FORMATS, EXPORT_FIELDS, detect_format, decode_lines, iter_records, quest_values, export_lines
 # from transformers import GPT2LMHeadModel, GPT2Tokenizer
 # from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline
 
+# Load environment variables from .env file
+load_dotenv()
+
 basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
+# orjson when installed, same output as Flask's encoder
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = os.getenv("GEMINI_API_KEY")
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'data/tasks.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(basedir)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Archived quests live in the main database unless ARCHIVE_DATABASE_URL is set
+# (e.g. sqlite:///data/archive.db), see archive_quests
+if os.getenv('ARCHIVE_DATABASE_URL'):
+    app.config['SQLALCHEMY_BINDS'] = {
+        'archive': dict(engine_options(os.getenv('ARCHIVE_DATABASE_URL')), url=os.getenv('ARCHIVE_DATABASE_URL'))
+    }
 db = SQLAlchemy(app)
-migrate = Migrate(app, db)
 
-# Load environment variables from .env file
-load_dotenv()
+# Flask-Migrate imports alembic and every dialect it supports, only the
+# `flask db` commands need it so web workers don't load it
+if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+    from flask_migrate import Migrate
+    migrate = Migrate(app, db)
+
+# WAL, busy_timeout and cache pragmas on every SQLite connection (no-op on other databases)
+with app.app_context():
+    for engine in db.engines.values():
+        install_sqlite_pragmas(engine)
+
+# Retrieve the API key, the Gemini SDK is configured by the LLM backend on first use
+app.config['GEMINI_API_KEY'] = os.getenv("GEMINI_API_KEY")
+
+# Backend used to generate quest descriptions: 'gemini', or 'stub' for offline
+# development and load tests (see llm.py for the STUB_LLM_* settings)
+for key in ('LLM_BACKEND', 'STUB_LLM_LATENCY_MS', 'STUB_LLM_LATENCY_JITTER_MS',
+            'STUB_LLM_LATENCY_DISTRIBUTION', 'STUB_LLM_FAILURE_RATE', 'STUB_LLM_SEED'):
+    if os.getenv(key) is not None:
+        app.config[key] = os.getenv(key)
+app.config.setdefault('LLM_BACKEND', 'gemini')
 
-# Retrieve the API key
-api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=api_key)
+# Prometheus metrics at /metrics, aggregated across the gunicorn workers when
+# PROMETHEUS_MULTIPROC_DIR is set. A request running more SQL statements than
+# its budget (QUERY_BUDGET, or per endpoint QUERY_BUDGETS=dashboard=8,...) logs a warning
+for key in ('METRICS_ENABLED', 'METRICS_TOKEN', 'PROMETHEUS_MULTIPROC_DIR', 'QUERY_BUDGET', 'QUERY_BUDGETS'):
+    if os.getenv(key) is not None:
+        app.config[key] = os.getenv(key)
+metrics = create_metrics(app.config, app.logger)
+with app.app_context():
+    metrics.init_app(app, db.engines.values())
 
 # Load the pre-trained GPT-2 model and tokenizer
 # model = GPT2LMHeadModel.from_pretrained('gpt2')
@@ -58,6 +114,19 @@ LEVEL_THRESHOLDS = {
     25: 116000  # Need 116000 points for level 25
 }
 
+def build_level_curve(config):
+    """Build the level curve selected by LEVEL_CURVE ('table' or 'exponential')"""
+    growth_rate = float(config.get('LEVEL_GROWTH_RATE', 1.15))
+    if config.get('LEVEL_CURVE', 'table') == 'exponential':
+        return exponential_curve(int(config.get('LEVEL_BASE_POINTS', 150)), growth_rate)
+    # Levels past the table keep growing from the last step of the table
+    return table_curve(LEVEL_THRESHOLDS, growth_rate)
+
+app.config['LEVEL_CURVE'] = os.getenv('LEVEL_CURVE', 'table')
+app.config['LEVEL_GROWTH_RATE'] = os.getenv('LEVEL_GROWTH_RATE', 1.15)
+app.config['LEVEL_BASE_POINTS'] = os.getenv('LEVEL_BASE_POINTS', 150)
+LEVEL_CURVE = build_level_curve(app.config)
+
 # Dictionary of quest templates
 DAILY_QUEST_TEMPLATES = {
     'strength': [
@@ -170,134 +239,53 @@ class User(db.Model):
     streak = db.Column(db.Integer, default=0)
     last_completed_date = db.Column(db.DateTime, nullable=True)
     points_this_week = db.Column(db.Integer, default=0)
-    achievements = db.Column(db.Text, default="")
+    unlocked_achievements = db.relationship('UserAchievement', backref='user', lazy=True,
+                                            order_by='UserAchievement.unlocked_at')
     daily_quests = db.relationship('DailyQuestAssignment', backref='user', lazy=True)
     last_daily_quest_date = db.Column(db.Date, nullable=True)
+    # Bumped by every change to the user's quests or stats, cached pages are keyed by it
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # IANA name and its current UTC offset in minutes, streak days are local days
+    timezone = db.Column(db.String(64), nullable=False, default=DEFAULT_TIMEZONE, server_default=DEFAULT_TIMEZONE)
+    utc_offset = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Local date of last_completed_date
+    last_completed_day = db.Column(db.Date, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_user_utc_offset_last_completed_day', 'utc_offset', 'last_completed_day'),
+        db.Index('ix_user_timezone_utc_offset', 'timezone', 'utc_offset'),
+    )
 
-    def update_streak(self):
-        """Update the user's streak based on quest completion timing"""
-        today = datetime.utcnow().date()
-        
-        if self.last_completed_date is None:
-            # First time completing a quest
-            self.streak = 1
-        else:
-            last_completion = self.last_completed_date.date()
-            days_difference = (today - last_completion).days
-            
-            if days_difference == 0:
-                # Same day completion, maintain current streak
-                pass
-            elif days_difference == 1:
-                # Consecutive day, increase streak
-                self.streak += 1
-            else:
-                # More than one day gap, reset streak
-                self.streak = 1
-        
-        self.last_completed_date = datetime.utcnow()
-
-    # Achievement definitions with their conditions
+    # Achievement definitions, each unlocked when a stat reaches its threshold
+    ACHIEVEMENT_ENGINE = AchievementEngine([
+        Achievement('WEEK_WARRIOR', '100 Points This Week!', 'points_this_week', 100),
+        Achievement('STREAK_MASTER', '7-Day Streak Achieved!', 'streak', 7),
+        Achievement('LEVEL_MASTER', 'Level Master!', 'points', 1000),
+        Achievement('POINTS_PRODIGY', '500 Points in Total!', 'points', 500),
+        Achievement('WEEK_CHAMPION', '200 Points This Week!', 'points_this_week', 200),
+        Achievement('STREAK_LEGEND', '14-Day Streak!', 'streak', 14),
+        Achievement('MONTHLY_GRINDER', '300 Points in Four Weeks!', 'points_four_weeks', 300),
+        Achievement('STREAK_MARATHONER', '30-Day Streak!', 'streak', 30),
+        Achievement('HALFWAY_HERO', 'Reach Halfway to 1000 Points!', 'points', 500),
+        Achievement('STREAK_STARTER', 'First 3-Day Streak!', 'streak', 3),
+        Achievement('WEEK_CONTRIBUTOR', '50 Points This Week!', 'points_this_week', 50),
+        Achievement('LIFELONG_LEARNER', '2000 Total Points!', 'points', 2000),
+    ])
     ACHIEVEMENTS = {
-            'WEEK_WARRIOR': {
-                'id': 'WEEK_WARRIOR',
-                'name': '100 Points This Week!',
-                'condition': lambda user: user.points_this_week >= 100
-            },
-            'STREAK_MASTER': {
-                'id': 'STREAK_MASTER',
-                'name': '7-Day Streak Achieved!',
-                'condition': lambda user: user.streak >= 7
-            },
-            'LEVEL_MASTER': {
-                'id': 'LEVEL_MASTER',
-                'name': 'Level Master!',
-                'condition': lambda user: user.points >= 1000
-            },
-            'POINTS_PRODIGY': {
-                'id': 'POINTS_PRODIGY',
-                'name': '500 Points in Total!',
-                'condition': lambda user: user.points >= 500
-            },
-            'WEEK_CHAMPION': {
-                'id': 'WEEK_CHAMPION',
-                'name': '200 Points This Week!',
-                'condition': lambda user: user.points_this_week >= 200
-            },
-            'STREAK_LEGEND': {
-                'id': 'STREAK_LEGEND',
-                'name': '14-Day Streak!',
-                'condition': lambda user: user.streak >= 14
-            },
-            'MONTHLY_GRINDER': {
-                'id': 'MONTHLY_GRINDER',
-                'name': '300 Points in Four Weeks!',
-                'condition': lambda user: user.points_this_week >= 300  # Sum up points_this_week over four weeks
-            },
-            'STREAK_MARATHONER': {
-                'id': 'STREAK_MARATHONER',
-                'name': '30-Day Streak!',
-                'condition': lambda user: user.streak >= 30
-            },
-            'HALFWAY_HERO': {
-                'id': 'HALFWAY_HERO',
-                'name': 'Reach Halfway to 1000 Points!',
-                'condition': lambda user: user.points >= 500
-            },
-            'STREAK_STARTER': {
-                'id': 'STREAK_STARTER',
-                'name': 'First 3-Day Streak!',
-                'condition': lambda user: user.streak >= 3
-            },
-            'WEEK_CONTRIBUTOR': {
-                'id': 'WEEK_CONTRIBUTOR',
-                'name': '50 Points This Week!',
-                'condition': lambda user: user.points_this_week >= 50
-            },
-            'LIFELONG_LEARNER': {
-                'id': 'LIFELONG_LEARNER',
-                'name': '2000 Total Points!',
-                'condition': lambda user: user.points >= 2000
-            }
-        }
-
+        achievement.id: {'id': achievement.id, 'name': achievement.name}
+        for achievement in ACHIEVEMENT_ENGINE.achievements.values()
+    }
 
-    def add_achievement(self, achievement_id):
-        """
-        Add a new achievement if it doesn't already exist
-        Args:
-            achievement_id: The ID of the achievement to add
-        """
-        if achievement_id not in self.ACHIEVEMENTS:
-            return False
-        
-        current_achievements = self.get_achievements()
-        if achievement_id not in current_achievements:
-            current_achievements.append(achievement_id)
-            self.achievements = ";".join(current_achievements)
-            return True
-        return False
 
     def get_achievements(self):
         """Get list of achievement IDs"""
-        return [ach.strip() for ach in self.achievements.split(";") if ach.strip()]
+        return [row.achievement_id for row in self.unlocked_achievements]
 
     def get_achievement_names(self):
         """Get list of achievement names for display"""
         achievement_ids = self.get_achievements()
         return [self.ACHIEVEMENTS[aid]['name'] for aid in achievement_ids if aid in self.ACHIEVEMENTS]
 
-    def check_and_award_achievements(self):
-        """Check and award any new achievements the user has earned"""
-        new_achievements = []
-        for achievement_id, achievement in self.ACHIEVEMENTS.items():
-            if (achievement_id not in self.get_achievements() and 
-                achievement['condition'](self)):
-                if self.add_achievement(achievement_id):
-                    new_achievements.append(achievement['name'])
-        return new_achievements
-
     def to_dict(self):
         return {
             'id': self.id,
@@ -306,55 +294,318 @@ class User(db.Model):
             'level': self.level,
             'streak': self.streak,
             'points_this_week': self.points_this_week,
+            'timezone': self.timezone,
             'achievements': self.get_achievement_names()
         }
 
-    def calculate_level(self):
-        """Calculate the user's level based on their points"""
-        current_level = 1
-        for level, threshold in sorted(LEVEL_THRESHOLDS.items()):
-            if self.points >= threshold:
-                current_level = level
-            else:
-                break
-        return current_level
-
     def points_to_next_level(self):
         """Calculate how many points needed for next level"""
-        current_level = self.level
-        if current_level >= max(LEVEL_THRESHOLDS.keys()):
+        next_level_threshold = LEVEL_CURVE.threshold(self.level + 1)
+        if next_level_threshold is None:
             return None  # Max level reached
         
-        next_level = current_level + 1
-        points_needed = LEVEL_THRESHOLDS[next_level] - self.points
+        points_needed = next_level_threshold - self.points
         return max(0, points_needed)
 
     def level_progress_percentage(self):
         """Calculate percentage progress to next level"""
-        if self.level >= max(LEVEL_THRESHOLDS.keys()):
+        next_level_threshold = LEVEL_CURVE.threshold(self.level + 1)
+        if next_level_threshold is None:
             return 100
         
-        current_level_threshold = LEVEL_THRESHOLDS[self.level]
-        next_level_threshold = LEVEL_THRESHOLDS[self.level + 1]
+        current_level_threshold = LEVEL_CURVE.threshold(self.level)
         points_in_current_level = self.points - current_level_threshold
         points_needed_for_level = next_level_threshold - current_level_threshold
         
         percentage = (points_in_current_level / points_needed_for_level) * 100
         return min(100, max(0, percentage))  # Ensure between 0 and 100
 
-    def update_points_and_level(self, points_earned):
-        """Update user's points and level, return level up message if applicable"""
-        old_level = self.level
-        self.points += points_earned
-        new_level = self.calculate_level()
-        
-        level_up_message = None
-        if new_level > old_level:
-            self.level = new_level
-            level_up_message = f"Congratulations! You've reached level {new_level}!"
-            # Add any level-up bonuses or rewards here
+def upsert(model):
+    """INSERT statement supporting ON CONFLICT clauses, or None if the database has none"""
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(model)
+
+def award_achievements(user_id, stats, previous_stats=None):
+    """
+    Unlock the achievements reached with the given stats
+    Args:
+        user_id: The user to award
+        stats: Current value of every stat of User.ACHIEVEMENT_ENGINE
+        previous_stats: Stats before the change, only achievements crossed since are checked
+    Returns:
+        List of the names of the newly unlocked achievements
+    """
+    engine = User.ACHIEVEMENT_ENGINE
+    if previous_stats is None:
+        candidates = engine.reached(stats)
+    else:
+        candidates = engine.crossed(previous_stats, stats)
+    if not candidates:
+        return []
+    
+    now = datetime.utcnow()
+    rows = [{'user_id': user_id, 'achievement_id': achievement.id, 'unlocked_at': now} for achievement in candidates]
+    statement = upsert(UserAchievement)
+    if statement is not None:
+        # Concurrent completions can't unlock the same achievement twice
+        statement = statement.on_conflict_do_nothing().returning(UserAchievement.achievement_id)
+        inserted = db.session.execute(statement, rows).scalars().all()
+    else:
+        # Only look up the candidates, not the whole unlocked list
+        unlocked = set(db.session.scalars(db.select(UserAchievement.achievement_id).filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_id.in_([row['achievement_id'] for row in rows])
+        )))
+        rows = [row for row in rows if row['achievement_id'] not in unlocked]
+        if rows:
+            db.session.execute(db.insert(UserAchievement), rows)
+        inserted = [row['achievement_id'] for row in rows]
+    
+    inserted = set(inserted)
+    return [achievement.name for achievement in candidates if achievement.id in inserted]
+
+class UserAchievement(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    achievement_id = db.Column(db.String(50), primary_key=True)
+    unlocked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_user_achievement_achievement_id', 'achievement_id'),
+    )
+
+class PointsLedgerEntry(db.Model):
+    """Append-only record of every reward credited to a user"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    quest_id = db.Column(db.Integer, nullable=True)  # No foreign key, entries outlive deleted quests
+    category = db.Column(db.String(50), nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_points_ledger_entry_user_created_at', 'user_id', 'created_at'),
+    )
+
+# Rollup periods, weeks start on Monday
+POINTS_PERIODS = ('day', 'week', 'month')
+
+def period_starts(day):
+    """First day of every rollup period containing the given date"""
+    return {
+        'day': day,
+        'week': day - timedelta(days=day.weekday()),
+        'month': day.replace(day=1)
+    }
+
+class PointsRollup(db.Model):
+    """Points per user and period, maintained on every ledger insert"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)  # One of POINTS_PERIODS
+    period_start = db.Column(db.Date, primary_key=True)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+def record_rewards(user_id, rewards, moment=None):
+    """
+    Append several rewards earned at the same moment to the ledger and add
+    their total to the user's rollups
+    Args:
+        user_id: The user credited
+        rewards: List of (points, category, quest_id) tuples, the category
+            e.g. the quest's first tag and quest_id None for other rewards
+        moment: When the rewards were earned (default now, UTC)
+    """
+    moment = moment or datetime.utcnow()
+    db.session.execute(db.insert(PointsLedgerEntry), [
+        {'user_id': user_id, 'quest_id': quest_id, 'category': category, 'points': points, 'created_at': moment}
+        for points, category, quest_id in rewards
+    ])
+    points = sum(reward[0] for reward in rewards)
+    
+    rows = [
+        {'user_id': user_id, 'period': period, 'period_start': start, 'points': points}
+        for period, start in period_starts(moment.date()).items()
+    ]
+    statement = upsert(PointsRollup)
+    if statement is not None:
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'period', 'period_start'],
+            set_={'points': PointsRollup.points + statement.excluded.points}
+        ), rows)
+        return
+    for row in rows:
+        updated = db.session.execute(
+            db.update(PointsRollup)
+            .where(PointsRollup.user_id == user_id,
+                   PointsRollup.period == row['period'],
+                   PointsRollup.period_start == row['period_start'])
+            .values(points=PointsRollup.points + points)
+        ).rowcount
+        if not updated:
+            db.session.execute(db.insert(PointsRollup), [row])
+
+def get_points_in_weeks(user_id, weeks, day=None):
+    """Points earned in the week containing day (default today, UTC) and the weeks - 1 before it"""
+    week_start = period_starts(day or datetime.utcnow().date())['week']
+    return db.session.scalar(
+        db.select(func.coalesce(func.sum(PointsRollup.points), 0)).where(
+            PointsRollup.user_id == user_id,
+            PointsRollup.period == 'week',
+            PointsRollup.period_start > week_start - timedelta(weeks=weeks)
+        )
+    )
+
+def rollover_week(day=None):
+    """
+    Reset every user's weekly points to what they earned in the week
+    containing day (default today, UTC), in one statement. Safe to run more
+    than once, the counters are read back from the weekly rollups.
+    Returns:
+        Number of users updated
+    """
+    week_start = period_starts(day or datetime.utcnow().date())['week']
+    earned = db.select(PointsRollup.points).where(
+        PointsRollup.user_id == User.id,
+        PointsRollup.period == 'week',
+        PointsRollup.period_start == week_start
+    ).scalar_subquery()
+    updated = db.session.execute(db.update(User).values(
+        points_this_week=func.coalesce(earned, 0),
+        data_version=User.data_version + 1
+    )).rowcount
+    db.session.commit()
+    leaderboard.invalidate('weekly')
+    return updated
+
+def backfill_achievements(batch_size=1000):
+    """
+    Unlock every achievement each user has reached. Completions only check
+    the thresholds they cross, so users already past the threshold of a new
+    or changed rule only get it from here. Users are read in batches of ids
+    with their stats, each batch unlocked in one insert. Safe to run more
+    than once.
+    Returns:
+        Number of achievements unlocked
+    """
+    week_start = period_starts(datetime.utcnow().date())['week']
+    points_four_weeks = db.select(func.coalesce(func.sum(PointsRollup.points), 0)).where(
+        PointsRollup.user_id == User.id,
+        PointsRollup.period == 'week',
+        PointsRollup.period_start > week_start - timedelta(weeks=4)
+    ).scalar_subquery()
+    
+    unlocked = 0
+    last_id = 0
+    while True:
+        users = db.session.execute(
+            db.select(User.id, User.points, User.points_this_week, User.streak, points_four_weeks)
+            .where(User.id > last_id).order_by(User.id).limit(batch_size)
+        ).all()
+        if not users:
+            return unlocked
         
-        return level_up_message
+        statement = upsert(UserAchievement)
+        if statement is None:
+            for user_id, points, points_this_week, streak, four_weeks in users:
+                unlocked += len(award_achievements(user_id, {
+                    'points': points, 'points_this_week': points_this_week,
+                    'points_four_weeks': four_weeks, 'streak': streak
+                }))
+        else:
+            now = datetime.utcnow()
+            rows = [
+                {'user_id': user_id, 'achievement_id': achievement.id, 'unlocked_at': now}
+                for user_id, points, points_this_week, streak, four_weeks in users
+                for achievement in User.ACHIEVEMENT_ENGINE.reached({
+                    'points': points, 'points_this_week': points_this_week,
+                    'points_four_weeks': four_weeks, 'streak': streak
+                })
+            ]
+            if rows:
+                user_ids = db.session.execute(
+                    statement.on_conflict_do_nothing().returning(UserAchievement.user_id), rows
+                ).scalars().all()
+                unlocked += len(user_ids)
+                if user_ids:
+                    # The achievements are on the cached dashboards
+                    db.session.execute(
+                        db.update(User).where(User.id.in_(set(user_ids))).values(data_version=User.data_version + 1)
+                    )
+        db.session.commit()
+        last_id = users[-1][0]
+
+def refresh_utc_offsets(now=None):
+    """
+    Store the current UTC offset of every timezone in use, one UPDATE per
+    timezone whose offset changed (DST starting or ending there)
+    Returns:
+        Number of users updated
+    """
+    now = now or datetime.utcnow()
+    updated = 0
+    for (name,) in db.session.execute(db.select(User.timezone).distinct()).all():
+        try:
+            offset = utc_offset_minutes(name, now)
+        except (ValueError, KeyError):
+            # Not known to this host's timezone database, keep the stored offset
+            continue
+        updated += db.session.execute(
+            db.update(User)
+            .where(User.timezone == name, User.utc_offset != offset)
+            .values(utc_offset=offset)
+        ).rowcount
+    db.session.commit()
+    return updated
+
+def decay_streaks(now=None):
+    """
+    Reset the streak of every user who missed a whole local day, in one
+    statement: users are bucketed by UTC offset, each bucket compared with
+    its own local yesterday. Safe to run at any time and more than once,
+    completions keep streaks from decaying by updating last_completed_day.
+    Returns:
+        Number of users whose streak was reset
+    """
+    now = now or datetime.utcnow()
+    offsets = db.session.execute(db.select(User.utc_offset).distinct()).scalars().all()
+    if not offsets:
+        return 0
+    cutoffs = decay_cutoffs(offsets, now)
+    decayed = db.session.execute(
+        db.update(User)
+        .where(
+            User.streak > 0,
+            or_(*[
+                and_(User.utc_offset == offset, User.last_completed_day < cutoff)
+                for offset, cutoff in cutoffs.items()
+            ])
+        )
+        .values(streak=0, data_version=User.data_version + 1)
+    ).rowcount
+    db.session.commit()
+    return decayed
+
+def set_user_timezone(user, name):
+    """
+    Set a user's timezone and its current offset, without committing
+    Raises:
+        ValueError: If the timezone is not known
+    """
+    user.timezone = validate_timezone(name)
+    user.utc_offset = utc_offset_minutes(name)
+
+class DescriptionCacheEntry(db.Model):
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of model config hash + normalized title
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    hits = db.Column(db.Integer, default=0)  # Reads that refreshed last_used_at, not every hit
 
 class DailyQuestTemplate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -374,6 +625,32 @@ class DailyQuestAssignment(db.Model):
     category = db.Column(db.String(50), nullable=False)
     completed = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        # One assignment per user per day, makes daily generation idempotent
+        db.UniqueConstraint('user_id', 'assigned_date', name='uq_daily_quest_assignment_user_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'assigned_date': self.assigned_date.isoformat(),
+            'category': self.category,
+            'completed': self.completed
+        }
+
+# Quest kinds, derived from the tags so the hot queries can use an index
+# instead of a LIKE scan over the JSON tags column
+QUEST_KIND_DAILY = 'daily'
+QUEST_KIND_SIDE = 'side'
+
+class QuestTag(db.Model):
+    quest_id = db.Column(db.Integer, db.ForeignKey('quest.id'), primary_key=True)
+    tag = db.Column(db.String(50), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_quest_tag_tag_quest_id', 'tag', 'quest_id'),
+    )
+
 class Quest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -390,20 +667,29 @@ class Quest(db.Model):
     due_date = db.Column(db.DateTime, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     priority = db.Column(db.Integer, default=1)  # 1 (low) to 5 (high)
+    kind = db.Column(db.String(20), nullable=False, default=QUEST_KIND_SIDE)  # 'daily' or 'side'
+    tag_rows = db.relationship('QuestTag', backref='quest', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_quest_user_completed_kind', 'user_id', 'completed', 'kind'),
+        db.Index('ix_quest_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_quest_user_completed_completion_date', 'user_id', 'completed', 'completion_date'),
+        # Ids are never reused, archive_quests moves quests out by id
+        {'sqlite_autoincrement': True},
+    )
 
     def set_tags(self, tags_list):
         """Convert tags list to JSON string before storing"""
-        if isinstance(tags_list, list):
-            self.tags = json.dumps(tags_list)
-        else:
-            self.tags = '[]'
+        if not isinstance(tags_list, list):
+            tags_list = []
+        self.tags = json.dumps(tags_list)
+        self.kind = QUEST_KIND_DAILY if QUEST_KIND_DAILY in tags_list else QUEST_KIND_SIDE
+        # Keep the normalized tag rows in sync (deduplicated, one row per tag)
+        self.tag_rows = [QuestTag(tag=tag) for tag in dict.fromkeys(str(t) for t in tags_list)]
 
     def get_tags(self):
         """Get tags as a Python list"""
-        try:
-            return json.loads(self.tags)
-        except (json.JSONDecodeError, TypeError):
-            return []
+        return decode_tags(self.tags)
 
     def to_dict(self):
         return {
@@ -415,12 +701,396 @@ class Quest(db.Model):
             'difficulty': self.difficulty,
             'reward': self.reward,
             'completed': self.completed,
-            'completion_date': self.completion_date.strftime('%Y-%m-%d %H:%M:%S') if self.completion_date else None,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'due_date': self.due_date.strftime('%Y-%m-%d %H:%M:%S') if self.due_date else None,
-            'priority': self.priority
+            'completion_date': format_datetime(self.completion_date),
+            'created_at': format_datetime(self.created_at),
+            'due_date': format_datetime(self.due_date),
+            'priority': self.priority,
+            'target': self.target,
+            'unit': self.unit,
+            'kind': self.kind
         }
 
+class ArchivedQuest(db.Model):
+    """
+    Completed quests and expired daily quests moved out of the quest table by
+    archive_quests. Rows keep the id they had as a quest; tags are only kept
+    as the JSON string, not as QuestTag rows.
+    """
+    __bind_key__ = 'archive' if 'archive' in app.config.get('SQLALCHEMY_BINDS', {}) else None
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    target = db.Column(db.Integer, nullable=True)
+    unit = db.Column(db.String(20), nullable=True)
+    tags = db.Column(db.Text, default='[]')
+    duration = db.Column(db.Integer, nullable=False, default=30)
+    difficulty = db.Column(db.String(20), nullable=False, default='Medium')
+    reward = db.Column(db.Integer, nullable=False)
+    completed = db.Column(db.Boolean, default=False)
+    completion_date = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True)
+    due_date = db.Column(db.DateTime, nullable=True)
+    user_id = db.Column(db.Integer, nullable=False)  # No foreign key, the archive may be another database
+    priority = db.Column(db.Integer, default=1)
+    kind = db.Column(db.String(20), nullable=False, default=QUEST_KIND_SIDE)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_archived_quest_user_completed_completion_date', 'user_id', 'completed', 'completion_date'),
+        db.Index('ix_archived_quest_user_id', 'user_id', 'id'),
+    )
+
+    get_tags = Quest.get_tags
+    to_dict = Quest.to_dict
+
+class IdempotencyKey(db.Model):
+    """
+    Response of a request sent with an Idempotency-Key header, replayed when
+    the user sends the same key again. Kept for IDEMPOTENCY_KEY_TTL.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)  # A key may only be reused for the same request
+    status_code = db.Column(db.Integer, nullable=True)
+    response = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+# Number of completed quests shown on the dashboard and per "load more" page
+RECENT_COMPLETIONS_LIMIT = 15
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row of a page as an opaque cursor string"""
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, return None if it is not valid JSON"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+def get_quest_stats(user_id):
+    """
+    Count active side quests and completed quests, in one aggregate query on
+    the quest table and an index-only count of the archived completions
+    """
+    active_count, completed_count = db.session.query(
+        func.coalesce(func.sum(case((and_(Quest.completed == False, Quest.kind == QUEST_KIND_SIDE), 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Quest.completed == True, 1), else_=0)), 0)
+    ).filter(Quest.user_id == user_id).one()
+    archived_count = db.session.execute(
+        db.select(func.count(ArchivedQuest.id)).where(ArchivedQuest.user_id == user_id, ArchivedQuest.completed == True)
+    ).scalar()
+    return active_count, completed_count + archived_count
+
+def quest_record_columns(model=Quest):
+    """Columns of a quest table (Quest or ArchivedQuest) in QuestRecord order"""
+    return [getattr(model, field) for field in QUEST_RECORD_FIELDS]
+
+def load_quest_records(statement, model=Quest):
+    """
+    Run a select of quest_record_columns(model) and build read-only
+    QuestRecords. The statement runs on the session's connection, in its
+    transaction, but skips the ORM (and so does not autoflush).
+    """
+    connection = db.session.connection(bind_arguments={'mapper': model.__mapper__})
+    return [QuestRecord(row) for row in connection.execute(statement)]
+
+def completed_quests_query(model, user_id, position, limit, criteria=()):
+    """Select of the completed quests of a quest table after a keyset position, newest first"""
+    query = db.select(*quest_record_columns(model)).where(
+        model.user_id == user_id,
+        model.completed == True,
+        *criteria
+    )
+
+    if position is not None:
+        last_date, last_id = position
+        if last_date is None:
+            # Legacy rows without a completion date sort last
+            query = query.where(model.completion_date.is_(None), model.id < last_id)
+        else:
+            query = query.where(or_(
+                model.completion_date < last_date,
+                model.completion_date.is_(None),
+                and_(model.completion_date == last_date, model.id < last_id)
+            ))
+
+    # PostgreSQL sorts NULLs first on DESC, SQLite last: the keyset above needs them last
+    return query.order_by(
+        model.completion_date.desc().nulls_last(),
+        model.id.desc()
+    ).limit(limit)
+
+def get_completed_quests_page(user_id, cursor=None, limit=RECENT_COMPLETIONS_LIMIT, criteria=None):
+    """
+    Get a page of completed quests as QuestRecords, newest first, using keyset
+    pagination. Reads the quest table and the archive with the same cursor and merges them.
+    Args:
+        user_id: The owner of the quests
+        cursor: Cursor returned with the previous page, None for the first page
+        limit: Maximum number of quests on the page
+        criteria: Function of a quest table (Quest or ArchivedQuest) returning
+            extra filters for its select, None for none
+    Returns:
+        (quests, next_cursor) where next_cursor is None on the last page
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    position = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if not isinstance(position, list) or len(position) != 2:
+            raise ValueError('Invalid cursor')
+        position = (datetime.fromisoformat(position[0]) if position[0] is not None else None, int(position[1]))
+
+    criteria = criteria or (lambda model: ())
+    quests = load_quest_records(completed_quests_query(Quest, user_id, position, limit + 1, criteria(Quest)))
+    quests += load_quest_records(
+        completed_quests_query(ArchivedQuest, user_id, position, limit + 1, criteria(ArchivedQuest)), ArchivedQuest
+    )
+    # Same order as the queries: completion date descending with missing dates last, then id
+    quests.sort(key=lambda quest: (quest.completion_date is not None, quest.completion_date or datetime.min, quest.id),
+                reverse=True)
+    # A quest being archived can briefly be in both tables
+    quests = list({quest.id: quest for quest in reversed(quests)}.values())[::-1]
+
+    next_cursor = None
+    if len(quests) > limit:
+        quests = quests[:limit]
+        last = quests[-1]
+        next_cursor = encode_cursor(last.completion_date, last.id)
+    return quests, next_cursor
+
+def get_quests_page(user_id, last_id, limit, criteria):
+    """
+    Get a page of quests as QuestRecords, highest id first, from the quest
+    table and the archive merged
+    Args:
+        user_id: The owner of the quests
+        last_id: Id of the last quest of the previous page, None for the first page
+        limit: Maximum number of quests on the page
+        criteria: Function of a quest table (Quest or ArchivedQuest) returning
+            extra filters for its select
+    Returns:
+        (quests, next_cursor) where next_cursor is None on the last page
+    """
+    quests = []
+    for model in (Quest, ArchivedQuest):
+        query = db.select(*quest_record_columns(model)).where(model.user_id == user_id, *criteria(model))
+        if last_id is not None:
+            query = query.where(model.id < last_id)
+        quests += load_quest_records(query.order_by(model.id.desc()).limit(limit + 1), model)
+    quests.sort(key=lambda quest: quest.id, reverse=True)
+    # A quest being archived can briefly be in both tables
+    quests = list({quest.id: quest for quest in reversed(quests)}.values())[::-1]
+
+    next_cursor = None
+    if len(quests) > limit:
+        quests = quests[:limit]
+        next_cursor = encode_cursor(quests[-1].id)
+    return quests, next_cursor
+
+# Leaderboards: 'memory' keeps sorted boards in each worker, reloaded every
+# LEADERBOARD_REFRESH seconds; 'redis' shares sorted sets between workers
+for key in ('LEADERBOARD_BACKEND', 'LEADERBOARD_REFRESH', 'LEADERBOARD_REDIS_URL'):
+    if os.getenv(key) is not None:
+        app.config[key] = os.getenv(key)
+leaderboard = create_leaderboard(app.config)
+
+# Board name -> the user column it ranks
+LEADERBOARD_COLUMNS = {
+    'all_time': User.points,
+    'weekly': User.points_this_week
+}
+
+# Concurrent first loads of a board share one query, refreshes run one at a
+# time per board in a background thread
+leaderboard_loads = SingleFlight()
+leaderboard_refreshes = set()
+leaderboard_refreshes_lock = threading.Lock()
+
+def load_leaderboard(board):
+    """Load a board from the database"""
+    leaderboard.begin_load(board)
+    column = LEADERBOARD_COLUMNS[board]
+    leaderboard.load(board, db.session.execute(db.select(User.id, func.coalesce(column, 0))).all())
+
+def refresh_leaderboard(board):
+    """Reload a board in a background thread, unless it is already being reloaded"""
+    with leaderboard_refreshes_lock:
+        if board in leaderboard_refreshes:
+            return
+        leaderboard_refreshes.add(board)
+    
+    def run():
+        try:
+            with app.app_context():
+                load_leaderboard(board)
+        except Exception as e:
+            print(f"Error refreshing the {board} leaderboard: {str(e)}")
+        finally:
+            with leaderboard_refreshes_lock:
+                leaderboard_refreshes.discard(board)
+    
+    threading.Thread(target=run, name=f'leaderboard-refresh-{board}', daemon=True).start()
+
+def get_leaderboard(board):
+    """
+    The leaderboard backend with the board loaded from the database. Only
+    the first load is waited for, by every concurrent request at once; a
+    stale board is served while it is reloaded in the background.
+    """
+    if not leaderboard.is_loaded(board):
+        leaderboard_loads.do(board, lambda: load_leaderboard(board))
+    elif leaderboard.is_stale(board):
+        refresh_leaderboard(board)
+    return leaderboard
+
+def update_leaderboards(user_id, points, points_this_week):
+    """Move a user on every loaded board after their points changed"""
+    leaderboard.update('all_time', user_id, points)
+    leaderboard.update('weekly', user_id, points_this_week)
+
+# Progress events pushed to the user's open pages: 'memory' reaches the
+# streams of the publishing worker only, 'redis' those of every worker
+for key in ('PROGRESS_BACKEND', 'PROGRESS_REDIS_URL', 'PROGRESS_HEARTBEAT', 'PROGRESS_STREAM_MAX_AGE'):
+    if os.getenv(key) is not None:
+        app.config[key] = os.getenv(key)
+progress = create_progress_broker(app.config)
+
+def announce_completion(user_id, completion):
+    """
+    Update the leaderboards and push the progress events of a committed
+    completion (see complete_quests_for_user) to the user's open pages
+    """
+    update_leaderboards(user_id, completion['points'], completion['points_this_week'])
+    events = [('points', {
+        'reward': completion['reward'],
+        'points': completion['points'],
+        'points_this_week': completion['points_this_week'],
+        'streak': completion['streak']
+    })]
+    if completion['level_up_message']:
+        events.append(('level_up', {'level': completion['level'], 'message': completion['level_up_message']}))
+    for achievement in completion['new_achievements']:
+        events.append(('achievement', {'name': achievement}))
+    if completion['daily_completed']:
+        events.append(('daily_complete', {}))
+    # The page that completed the quests shows its own response instead
+    for _, data in events:
+        data['quest_ids'] = completion['quest_ids']
+    # The completion is committed, a broker outage only costs the live update
+    try:
+        for event, data in events:
+            progress.publish(user_id, event, data)
+    except Exception as e:
+        print(f"Error publishing progress events: {str(e)}")
+
+def get_rank(board, user):
+    """1-based rank of the user on a board"""
+    backend = get_leaderboard(board)
+    rank = backend.rank(board, user.id)
+    if rank is None:
+        # Registered since the board was loaded
+        backend.update(board, user.id, getattr(user, LEADERBOARD_COLUMNS[board].key))
+        rank = backend.rank(board, user.id)
+    return rank
+
+def leaderboard_entries(entries):
+    """Serialize (rank, user_id, score) tuples with the usernames, in one query"""
+    usernames = dict(db.session.execute(
+        db.select(User.id, User.username).where(User.id.in_([user_id for _, user_id, _ in entries]))
+    ).all()) if entries else {}
+    return [
+        {'rank': rank, 'user_id': user_id, 'username': usernames.get(user_id), 'points': score}
+        for rank, user_id, score in entries
+    ]
+
+# Rendered pages per user: 'memory' (LRU per worker), 'file' (shared by the
+# workers on the host, in PAGE_CACHE_DIR) or 'none'
+for key in ('PAGE_CACHE_BACKEND', 'PAGE_CACHE_SIZE', 'PAGE_CACHE_DIR'):
+    if os.getenv(key) is not None:
+        app.config[key] = os.getenv(key)
+app.config.setdefault('PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'the-system-page-cache'))
+page_cache = create_fragment_cache(app.config, metrics.cache_listener('fragment_cache'))
+
+def bump_data_version(user_id):
+    """Invalidate the user's cached pages and ETags, part of the caller's transaction"""
+    db.session.execute(
+        db.update(User).where(User.id == user_id).values(data_version=User.data_version + 1)
+    )
+
+def user_data_version(user_id):
+    """The user's data version without loading the user"""
+    return db.session.query(User.data_version).filter(User.id == user_id).scalar()
+
+def templates_version():
+    """Hash of the templates, so pages rendered by an older release are neither reused nor validated"""
+    digest = hashlib.sha1()
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    for root, dirs, files in os.walk(template_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, template_dir).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+TEMPLATES_VERSION = templates_version()
+
+def make_etag(*parts):
+    """Strong ETag of the user data a response is built from"""
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+def add_validators(response, etag):
+    """
+    ETag and caching headers of a per-user response: browsers and proxies may
+    keep it but must revalidate it, and never share it between sessions
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+def not_modified(etag):
+    """304 response if the request's If-None-Match matches the etag, otherwise None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return add_validators(app.response_class(status=304), etag)
+
+def render_cached_page(user, name, version, template, build_context):
+    """
+    Render a page for the user, reusing the cached copy while the version is
+    unchanged, or answer 304 if the client's copy (If-None-Match) has the
+    same version. Pages showing flash messages are rendered fresh and not cached.
+    Args:
+        user: The logged in user
+        name: Name of the page in the cache
+        version: Token that changes whenever the page content would
+        template: Template to render
+        build_context: Function returning the template context, only called on a miss
+    """
+    if '_flashes' in session:
+        return render_template(template, **build_context())
+    version = f'{TEMPLATES_VERSION}:{version}'
+    etag = make_etag(user.id, name, version)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    body = page_cache.get(user.id, name, version)
+    cache_status = 'HIT'
+    if body is None:
+        body = render_template(template, **build_context())
+        page_cache.set(user.id, name, version, body)
+        cache_status = 'MISS'
+    response = app.make_response(body)
+    response.headers['X-Page-Cache'] = cache_status
+    return add_validators(response, etag)
+
 @app.route('/')
 def index():
     if 'user_id' not in session:
@@ -441,6 +1111,11 @@ def register():
             username=username,
             password_hash=generate_password_hash(password)
         )
+        # Filled in by the browser, streak days are local days
+        try:
+            set_user_timezone(user, request.form.get('timezone') or DEFAULT_TIMEZONE)
+        except ValueError:
+            set_user_timezone(user, DEFAULT_TIMEZONE)
         db.session.add(user)
         db.session.commit()
         flash('Registration successful!')
@@ -474,29 +1149,54 @@ def dashboard():
     
     user = User.query.get_or_404(session['user_id'])
     
-    # Get other active quests (non-daily)
-    active_quests = Quest.query.filter(
-        Quest.user_id == user.id,
-        Quest.completed == False,
-        ~Quest.tags.like('%"daily"%')
-    ).all()
+    # Ranks move without the user changing anything, so they are part of the version
+    rank = get_rank('all_time', user)
+    weekly_rank = get_rank('weekly', user)
     
-    completed_quests = Quest.query.filter_by(
-        user_id=user.id,
-        completed=True
-    ).all()
+    def build_context():
+        # Count active (non-daily) and completed quests without loading them
+        active_count, completed_count = get_quest_stats(user.id)
+        
+        # Only the most recent completions are rendered, older ones are loaded on demand
+        completed_quests, next_cursor = get_completed_quests_page(user.id)
+        
+        return {
+            'user': user,
+            'completed_quests': completed_quests,
+            'next_cursor': next_cursor,
+            'stats': {
+                'total_points': user.points,
+                'points_this_week': user.points_this_week,
+                'streak': user.streak,
+                'achievements': user.get_achievements(),
+                'active_quests': active_count,
+                'completed_quests': completed_count,
+                'rank': rank,
+                'weekly_rank': weekly_rank
+            }
+        }
+    
+    version = f'{user.data_version}:{rank}:{weekly_rank}'
+    return render_cached_page(user, 'dashboard', version, 'dashboard.html', build_context)
+
+@app.route('/dashboard/history')
+def completed_history():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
     
-    return render_template('dashboard.html',
-                         user=user,
-                         completed_quests=completed_quests,
-                         stats={
-                             'total_points': user.points,
-                             'points_this_week': user.points_this_week,
-                             'streak': user.streak,
-                             'achievements': user.get_achievements(),
-                             'active_quests': len(active_quests),
-                             'completed_quests': len(completed_quests)
-                         })
+    etag = make_etag(session['user_id'], user_data_version(session['user_id']), request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    try:
+        quests, next_cursor = get_completed_quests_page(session['user_id'], request.args.get('cursor'))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return add_validators(jsonify({
+        'quests': [quest.to_dict() for quest in quests],
+        'next_cursor': next_cursor
+    }), etag)
 
 @app.route('/add_quest', methods=['GET', 'POST'])
 def add_quest():
@@ -506,16 +1206,10 @@ def add_quest():
     user = User.query.get_or_404(session['user_id'])
    
     if request.method == 'POST':
-        # # Debug print to see what's coming from the form
-        print("Form data:", request.form)
-        # tags = request.form.getlist('tags[]')
-        # print("Received tags:", tags)  # Debug print
-
         # Get tags string and process it
         tags_string = request.form.get('tags[]', '')
         # Split by comma, strip whitespace, and filter out empty strings
         tags = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-        print("Received tags:", tags)  # Debug print
         
         duration = int(request.form.get('duration', 30))
         due_date_str = request.form.get('due_date')
@@ -539,15 +1233,11 @@ def add_quest():
         )
         
         new_quest.set_tags(tags)
-        print("Tags after setting:", new_quest.tags)  # Debug print
         
         db.session.add(new_quest)
+        bump_data_version(user.id)
         db.session.commit()
         
-        # Verify tags after commit
-        db.session.refresh(new_quest)
-        print("Tags after commit:", new_quest.tags)  # Debug print
-        
         flash('Quest added successfully!')
         return redirect(url_for('dashboard'))
    
@@ -560,39 +1250,43 @@ def quests():
     
     user = User.query.get_or_404(session['user_id'])
     
-    # Generate daily quests if needed
-    generate_daily_quests(user.id)
-    
-    # Get today's daily quests
+    # Daily quests are normally generated by the nightly job, only fill the gap if it has not run
     today = date.today()
-    daily_quests = Quest.query.filter(
-        Quest.user_id == user.id,
-        Quest.created_at >= today,
-        Quest.tags.like('%"daily"%'),
-        # Quest.completed == False
-    ).all()
+    if user.last_daily_quest_date != today:
+        generate_daily_quests(user.id)
     
-    # Get regular active quests (non-daily)
-    active_quests = Quest.query.filter(
-        Quest.user_id == user.id,
-        Quest.completed == False,
-        ~Quest.tags.like('%"daily"%')
-    ).all()
-    
-    # Get daily training category
-    daily_assignment = DailyQuestAssignment.query.filter_by(
-        user_id=user.id,
-        assigned_date=today
-    ).first()
-    
-    daily_category = daily_assignment.category if daily_assignment else None
+    def build_context():
+        # Get today's daily quests
+        daily_quests = load_quest_records(db.select(*quest_record_columns()).where(
+            Quest.user_id == user.id,
+            Quest.created_at >= today,
+            Quest.kind == QUEST_KIND_DAILY,
+            # Quest.completed == False
+        ))
+        
+        # Get regular active quests (non-daily)
+        active_quests = load_quest_records(db.select(*quest_record_columns()).where(
+            Quest.user_id == user.id,
+            Quest.completed == False,
+            Quest.kind == QUEST_KIND_SIDE
+        ))
+        
+        # Get daily training category
+        daily_assignment = DailyQuestAssignment.query.filter_by(
+            user_id=user.id,
+            assigned_date=today
+        ).first()
+        
+        return {
+            'user': user,
+            'daily_quests': daily_quests,
+            'active_quests': active_quests,
+            'daily_category': daily_assignment.category if daily_assignment else None
+        }
     
-    return render_template('quests.html', 
-                         user=user,
-                         daily_quests=daily_quests,
-                         active_quests=active_quests,
-                         daily_category=daily_category
-                         )
+    # Today's daily quests change at midnight
+    version = f'{user.data_version}:{today.isoformat()}'
+    return render_cached_page(user, 'quests', version, 'quests.html', build_context)
 
 @app.route('/edit_quest/<int:quest_id>', methods=['GET', 'POST'])
 def edit_quest(quest_id):
@@ -623,6 +1317,7 @@ def edit_quest(quest_id):
         else:
             quest.due_date = None
         
+        bump_data_version(quest.user_id)
         db.session.commit()
         flash('Quest updated successfully!')
         return redirect(url_for('dashboard'))
@@ -640,6 +1335,7 @@ def delete_quest(quest_id):
         return redirect(url_for('dashboard'))
     
     db.session.delete(quest)
+    bump_data_version(quest.user_id)
     db.session.commit()
     flash('Quest deleted successfully!')
     return redirect(url_for('dashboard'))
@@ -650,9 +1346,128 @@ def suggest_description():
         quest_title = request.json['questTitle']
         suggested_description = generate_description(quest_title)
         return jsonify({'suggestedDescription': suggested_description})
+    except DescriptionBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Maximum number of titles accepted by /suggest_descriptions
+MAX_SUGGESTED_DESCRIPTIONS = 100
+
+@app.route('/suggest_descriptions', methods=['POST'])
+def suggest_descriptions():
+    quest_titles = (request.get_json(silent=True) or {}).get('questTitles')
+    if not isinstance(quest_titles, list) or not all(isinstance(title, str) and title for title in quest_titles):
+        return jsonify({'error': 'questTitles must be a list of titles'}), 400
+    if len(quest_titles) > MAX_SUGGESTED_DESCRIPTIONS:
+        return jsonify({'error': f'At most {MAX_SUGGESTED_DESCRIPTIONS} titles per request'}), 400
+    
+    try:
+        return jsonify({'suggestedDescriptions': generate_descriptions(quest_titles)})
+    except DescriptionBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def sse_event(event, data):
+    """Format a Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/suggest_description/stream', methods=['POST'])
+def suggest_description_stream():
+    """Stream a generated description as Server-Sent Events (token, then done or error)"""
+    quest_title = (request.get_json(silent=True) or {}).get('questTitle')
+    if not quest_title:
+        return jsonify({'error': 'questTitle is required'}), 400
+    
+    key = cache_key(quest_title, DESCRIPTION_CONFIG_HASH)
+    cached = description_cache.get(key)
+    if cached is not None:
+        events = [sse_event('token', {'text': cached}), sse_event('done', {'description': cached})]
+        return Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    
+    slot = description_slots.acquire(app.config['DESCRIPTION_SLOT_WAIT'])
+    if slot is None:
+        return jsonify({'error': DescriptionBusyError.message}), 503, {'Retry-After': '2'}
+    
+    def generate():
+        deadline = time.monotonic() + app.config['DESCRIPTION_TIMEOUT']
+        parts = []
+        try:
+            chunks = get_llm_backend().stream(
+                DESCRIPTION_PROMPT.format(quest_title=quest_title),
+                timeout=app.config['DESCRIPTION_TIMEOUT']
+            )
+            for text in chunks:
+                if time.monotonic() > deadline:
+                    yield sse_event('error', {'error': 'Description generation timed out.'})
+                    return
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+            
+            description = ''.join(parts).strip()
+            if description:
+                description_cache.set(key, quest_title[:200], description)
+                yield sse_event('done', {'description': description})
+            else:
+                yield sse_event('error', {'error': DESCRIPTION_FAILED})
+        except Exception as e:
+            print(f"Error generating description: {str(e)}")
+            yield sse_event('error', {'error': DESCRIPTION_FAILED})
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes the response on completion, timeout and client
+    # disconnect alike, also when the body was never iterated (a generator's
+    # finally would not run then)
+    response.call_on_close(lambda: description_slots.release(slot))
+    return response
+
+# A comment line every PROGRESS_HEARTBEAT seconds keeps proxies from closing
+# an idle stream; after PROGRESS_STREAM_MAX_AGE seconds the stream ends and
+# the browser reconnects, so a worker thread is not held forever
+app.config.setdefault('PROGRESS_HEARTBEAT', 15)
+app.config.setdefault('PROGRESS_STREAM_MAX_AGE', 300)
+
+@app.route('/progress/stream')
+def progress_stream():
+    """
+    Stream the user's progress events as Server-Sent Events: points (after
+    every completion), level_up, achievement and daily_complete
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    user_id = session['user_id']
+    heartbeat = float(app.config['PROGRESS_HEARTBEAT'])
+    max_age = float(app.config['PROGRESS_STREAM_MAX_AGE'])
+    
+    def generate():
+        # Subscribed once the response is sent, a stream never started would
+        # never be closed
+        subscription = progress.subscribe(user_id)
+        deadline = time.monotonic() + max_age
+        try:
+            # Reconnect delay of the browser, in milliseconds
+            yield 'retry: 3000\n\n'
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                message = subscription.get(timeout=min(heartbeat, remaining))
+                if message is None:
+                    yield ': heartbeat\n\n'
+                else:
+                    yield sse_event(*message)
+        finally:
+            # Runs on expiry and client disconnect alike
+            subscription.close()
+    
+    # No stream_with_context: the stream doesn't need the request, and the
+    # database session is released while it waits
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/complete_quest/<int:quest_id>', methods=['POST'])
 def complete_quest(quest_id):
     if 'user_id' not in session:
@@ -662,67 +1477,1040 @@ def complete_quest(quest_id):
     user_id = session['user_id']
     
     if quest.user_id != user_id:
+        if request.is_json:
+            return jsonify({'success': False, 'error': 'Unauthorized action'}), 403
         flash('Unauthorized action')
         return redirect(url_for('dashboard'))
     
-    if not quest.completed:
-        quest.completed = True
-        quest.completion_date = datetime.utcnow()
-        user = User.query.get(user_id)
-        
-        total_reward = quest.reward
-        # Update points, level, and get level up message if any
-        level_up_message = user.update_points_and_level(total_reward)
-        
-        # Update streak and points_this_week
-        user.points += total_reward
-        if user.points_this_week is None:
-            user.points_this_week = 0
-        user.points_this_week += total_reward
-        
-        # Use the new streak update method
-        user.update_streak()
-        
-        # Check and award achievements
-        new_achievements = user.check_and_award_achievements()
-        
-        # Get today's daily quests
-        today = date.today()
-        daily_quests = Quest.query.filter(
-            Quest.user_id == user_id,
-            Quest.created_at >= today,
-            Quest.tags.like('%"daily"%')
-        ).all()
-        
-        # Check if all daily quests are completed
-        all_daily_completed = all(dq.completed for dq in daily_quests)
-        
-        # If there are daily quests and they're all completed, update the assignment
-        if daily_quests and all_daily_completed:
-            assignment = DailyQuestAssignment.query.filter_by(
-                user_id=user_id,
-                # date=today
-            ).first()
-            
-            if assignment:
-                assignment.completed = True
-                flash('Congratulations! You have completed all daily quests. Click here to view rewards', 'success')
-        
-        db.session.commit()
+    result = complete_quest_for_user(quest.id, user_id)
+    # Pages completing through fetch() show the progress events instead of flashes
+    if result is not None and not request.is_json:
+        if result['daily_completed']:
+            flash('Congratulations! You have completed all daily quests. Click here to view rewards', 'success')
         
         # Flash messages for quest completion and achievements
-        flash(f'Quest completed! You earned {total_reward} points!')
-        if level_up_message:
-            flash(level_up_message, 'success')
-        for achievement in new_achievements:
+        flash(f'Quest completed! You earned {result["reward"]} points!')
+        if result['level_up_message']:
+            flash(result['level_up_message'], 'success')
+        for achievement in result['new_achievements']:
             flash(f'New Achievement Unlocked: {achievement}', 'success')
     
+    # The quests page completes quests through fetch() and expects JSON
+    if request.is_json:
+        return jsonify({'success': True, 'quest': quest.to_dict(), 'result': result})
     return redirect(url_for('dashboard'))
 
-def initialize_quest_templates():
-    """Initialize the database with quest templates if they don't exist"""
-    with app.app_context():
-        if DailyQuestTemplate.query.count() == 0:
+def complete_quest_for_user(quest_id, user_id):
+    """
+    Complete a quest and credit its reward as one transaction
+    
+    Every change is a conditional UPDATE applied in the database, so two
+    concurrent completions of the same quest (two tabs, retries) credit the
+    reward exactly once.
+    
+    Args:
+        quest_id: The quest to complete
+        user_id: The owner of the quest
+    Returns:
+        dict with the reward, level up message, new achievement names and
+        whether today's daily quests are now all completed, or None if the
+        quest was already completed (or is not the user's)
+    """
+    return complete_quests_for_user([quest_id], user_id)
+
+def complete_quests_for_user(quest_ids, user_id, commit=True):
+    """
+    Complete several quests of a user, crediting their rewards with a single
+    user update, level and achievement check and daily assignment check.
+    Quests already completed (or not the user's) are skipped, see
+    complete_quest_for_user.
+    Args:
+        quest_ids: The quests to complete
+        user_id: The owner of the quests
+        commit: Commit and announce the completion; otherwise the caller
+            commits, then calls announce_completion with the returned dict
+    Returns:
+        dict with the total reward, the completed quest ids, level up message,
+        new achievement names, whether today's daily quests are now all
+        completed and the user's new points, points_this_week, streak and
+        level, or None if no quest was completed
+    """
+    now = datetime.utcnow()
+    today = date.today()
+    
+    completed = db.session.execute(
+        db.update(Quest)
+        .where(Quest.id.in_(quest_ids), Quest.user_id == user_id, Quest.completed == False)
+        .values(completed=True, completion_date=now)
+        .returning(Quest.id, Quest.reward, Quest.kind, Quest.tags)
+    ).all()
+    if not completed:
+        if commit:
+            db.session.rollback()
+        return None
+    total_reward = sum(reward for _, reward, _, _ in completed)
+    
+    # Credit the reward and update the streak relative to the last completion,
+    # both days in the user's timezone
+    utc_offset = db.session.execute(db.select(User.utc_offset).where(User.id == user_id)).scalar_one()
+    local_today = local_date(now, utc_offset)
+    points, points_this_week, streak, level = db.session.execute(
+        db.update(User)
+        .where(User.id == user_id)
+        .values(
+            points=func.coalesce(User.points, 0) + total_reward,
+            points_this_week=func.coalesce(User.points_this_week, 0) + total_reward,
+            streak=case(
+                (User.last_completed_day == local_today, func.coalesce(User.streak, 1)),  # Same day
+                (User.last_completed_day == local_today - timedelta(days=1), func.coalesce(User.streak, 0) + 1),  # Consecutive day
+                else_=1  # First completion or a gap of more than one day
+            ),
+            last_completed_date=now,
+            last_completed_day=local_today,
+            data_version=User.data_version + 1
+        )
+        .returning(User.points, User.points_this_week, User.streak, User.level)
+    ).one()
+    
+    # Levels only go up, the condition keeps a concurrent higher level
+    level_up_message = None
+    new_level = LEVEL_CURVE.level_for(points)
+    if new_level > (level or 1):
+        leveled_up = db.session.execute(
+            db.update(User)
+            .where(User.id == user_id, or_(User.level.is_(None), User.level < new_level))
+            .values(level=new_level)
+        ).rowcount
+        if leveled_up:
+            level = new_level
+            level_up_message = f"Congratulations! You've reached level {new_level}!"
+    
+    # Daily quests are tagged [category, 'daily'], side quests use their first tag
+    rewards = []
+    for quest_id, reward, kind, tags in completed:
+        tags = decode_tags(tags)
+        rewards.append((reward, tags[0] if tags else kind, quest_id))
+    record_rewards(user_id, rewards, now)
+    points_four_weeks = get_points_in_weeks(user_id, 4, now.date())
+    
+    # Check and award the achievements whose thresholds were crossed
+    stats = {
+        'points': points,
+        'points_this_week': points_this_week,
+        'points_four_weeks': points_four_weeks,
+        'streak': streak
+    }
+    previous_stats = {
+        'points': points - total_reward,
+        'points_this_week': points_this_week - total_reward,
+        'points_four_weeks': points_four_weeks - total_reward,
+        'streak': streak - 1
+    }
+    new_achievements = award_achievements(user_id, stats, previous_stats)
+    
+    # Completing the last open daily quest of the day completes the assignment
+    daily_completed = False
+    if any(kind == QUEST_KIND_DAILY for _, _, kind, _ in completed):
+        open_daily_quests = db.select(Quest.id).where(
+            Quest.user_id == user_id,
+            Quest.completed == False,
+            Quest.kind == QUEST_KIND_DAILY,
+            Quest.created_at >= today
+        ).exists()
+        daily_completed = db.session.execute(
+            db.update(DailyQuestAssignment)
+            .where(
+                DailyQuestAssignment.user_id == user_id,
+                DailyQuestAssignment.assigned_date == today,
+                or_(DailyQuestAssignment.completed.is_(None), DailyQuestAssignment.completed == False),
+                ~open_daily_quests
+            )
+            .values(completed=True)
+        ).rowcount > 0
+    
+    completion = {
+        'reward': total_reward,
+        'quest_ids': [quest_id for quest_id, _, _, _ in completed],
+        'level_up_message': level_up_message,
+        'new_achievements': new_achievements,
+        'daily_completed': daily_completed,
+        'points': points,
+        'points_this_week': points_this_week,
+        'streak': streak,
+        'level': level or 1
+    }
+    if commit:
+        db.session.commit()
+        announce_completion(user_id, completion)
+    return completion
+
+# JSON API (v1)
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def api_page_size():
+    """Read the ?limit= argument, clamped to API_MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', API_PAGE_SIZE, type=int)
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+def api_fields():
+    """Read the ?fields= projection as a list, None when every field is wanted"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+def project(data, fields):
+    """Keep only the requested keys of a serialized row"""
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields if field in data}
+
+def parse_bool_arg(value):
+    if value is None:
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Invalid boolean: {value}')
+
+def parse_datetime_arg(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
+
+def decode_id_cursor(cursor):
+    """Decode a cursor holding a single row id, return None if it is not valid"""
+    position = decode_cursor(cursor)
+    if not isinstance(position, list) or len(position) != 1 or not isinstance(position[0], int):
+        return None
+    return position[0]
+
+def api_current_user():
+    if 'user_id' not in session:
+        return None
+    return User.query.get(session['user_id'])
+
+def api_owned_quest(quest_id, archived=False):
+    """
+    Return the quest if it belongs to the current user, None otherwise. With
+    archived, a quest moved to the archive is returned as a read-only
+    ArchivedQuest.
+    """
+    quest = Quest.query.get(quest_id)
+    if quest is None and archived:
+        quest = db.session.get(ArchivedQuest, quest_id)
+    if quest is None or quest.user_id != session.get('user_id'):
+        return None
+    return quest
+
+def api_missing_quest(quest_id):
+    """Error for a quest that is not in the quest table: 409 if the user's quest was archived, else 404"""
+    if api_owned_quest(quest_id, archived=True) is not None:
+        return api_error('Archived quests are read-only', 409)
+    return api_error('Quest not found', 404)
+
+def apply_quest_payload(quest, payload):
+    """
+    Copy the writable fields of a JSON payload onto a quest
+    Raises:
+        ValueError: If a field has an invalid value
+    """
+    for field in ('name', 'description', 'difficulty', 'unit'):
+        if field in payload:
+            value = payload[field]
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f'{field} must be a string')
+            setattr(quest, field, value)
+    for field in ('duration', 'reward', 'priority', 'target'):
+        if field in payload:
+            value = payload[field]
+            if value is not None:
+                if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                    raise ValueError(f'{field} must be an integer')
+                try:
+                    value = int(value)
+                except (ValueError, TypeError, OverflowError):
+                    raise ValueError(f'{field} must be an integer')
+            setattr(quest, field, value)
+    if 'due_date' in payload:
+        try:
+            quest.due_date = parse_datetime_arg(payload['due_date'])
+        except (ValueError, TypeError):
+            raise ValueError('due_date must be an ISO date')
+    if 'tags' in payload:
+        quest.set_tags(payload['tags'])
+    if not quest.name:
+        raise ValueError('name is required')
+    if quest.reward is None:
+        raise ValueError('reward is required')
+
+@app.route('/api/v1/users/me')
+def api_get_current_user():
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    etag = make_etag(user.id, user.data_version, request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    return add_validators(jsonify(project(user.to_dict(), api_fields())), etag)
+
+@app.route('/api/v1/users/me', methods=['PATCH'])
+def api_update_current_user():
+    """Update the user's settings, for now the timezone their streak days follow"""
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    
+    payload = request.get_json(silent=True) or {}
+    if 'timezone' in payload:
+        try:
+            set_user_timezone(user, payload['timezone'])
+        except ValueError as e:
+            return api_error(str(e), 400)
+    
+    bump_data_version(user.id)
+    db.session.commit()
+    return jsonify(user.to_dict())
+
+@app.route('/api/v1/quests', methods=['GET'])
+def api_list_quests():
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    etag = make_etag(user.id, user.data_version, request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    try:
+        completed = parse_bool_arg(request.args.get('completed'))
+        priority = request.args.get('priority', type=int)
+        due_before = parse_datetime_arg(request.args.get('due_before'))
+        due_after = parse_datetime_arg(request.args.get('due_after'))
+    except ValueError as e:
+        return api_error(str(e), 400)
+    
+    def criteria(model):
+        """Filters of the request on a quest table, the quest table or the archive"""
+        filters = []
+        if completed is False:
+            filters.append(model.completed == False)
+        if priority is not None:
+            filters.append(model.priority == priority)
+        if due_before is not None:
+            filters.append(model.due_date < due_before)
+        if due_after is not None:
+            filters.append(model.due_date >= due_after)
+        if request.args.get('kind'):
+            filters.append(model.kind == request.args['kind'])
+        if request.args.get('tag'):
+            if model is Quest:
+                filters.append(Quest.id.in_(db.select(QuestTag.quest_id).where(QuestTag.tag == request.args['tag'])))
+            else:
+                # The archive keeps the tags only as the JSON string
+                filters.append(model.tags.contains(json.dumps(request.args['tag']), autoescape=True))
+        return filters
+    
+    # Both tables are read, archived quests are listed like the others
+    cursor = request.args.get('cursor')
+    limit = api_page_size()
+    if completed:
+        # Newest completions first, like the completed history
+        try:
+            quests, next_cursor = get_completed_quests_page(user.id, cursor, limit, criteria)
+        except (ValueError, TypeError):
+            return api_error('Invalid cursor', 400)
+    else:
+        last_id = None
+        if cursor:
+            last_id = decode_id_cursor(cursor)
+            if last_id is None:
+                return api_error('Invalid cursor', 400)
+        quests, next_cursor = get_quests_page(user.id, last_id, limit, criteria)
+    
+    fields = api_fields()
+    return add_validators(jsonify({
+        'quests': [project(quest.to_dict(), fields) for quest in quests],
+        'next_cursor': next_cursor
+    }), etag)
+
+@app.route('/api/v1/quests', methods=['POST'])
+def api_create_quest():
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    
+    # A list of quests creates them all in one transaction
+    payload = request.get_json(silent=True) or {}
+    payloads = payload if isinstance(payload, list) else [payload]
+    if not all(isinstance(item, dict) for item in payloads):
+        return api_error('Expected a quest object or a list of quest objects', 400)
+    
+    try:
+        describe = parse_bool_arg(request.args.get('describe', 'false'))
+    except ValueError as e:
+        return api_error(str(e), 400)
+    
+    # Every quest is validated before any description is generated
+    quests = []
+    for index, item in enumerate(payloads):
+        quest = Quest(user_id=user.id)
+        quest.set_tags([])
+        try:
+            apply_quest_payload(quest, item)
+        except (ValueError, TypeError) as e:
+            message = str(e) if len(payloads) == 1 else f'Quest {index}: {e}'
+            return api_error(message, 400)
+        quests.append(quest)
+    
+    # ?describe=1 fills in missing descriptions with one batched generation
+    if describe:
+        titles = [quest.name for quest in quests if not quest.description]
+        if titles:
+            try:
+                descriptions = generate_descriptions(titles)
+            except DescriptionBusyError as e:
+                return api_error(str(e), 503)
+            for quest in quests:
+                if not quest.description:
+                    quest.description = descriptions.get(quest.name)
+    
+    db.session.add_all(quests)
+    bump_data_version(user.id)
+    db.session.commit()
+    if isinstance(payload, list):
+        return jsonify({'quests': [quest.to_dict() for quest in quests]}), 201
+    return jsonify(quests[0].to_dict()), 201
+
+@app.route('/api/v1/quests/<int:quest_id>', methods=['GET'])
+def api_get_quest(quest_id):
+    if 'user_id' not in session:
+        return api_error('Authentication required', 401)
+    etag = make_etag(session['user_id'], user_data_version(session['user_id']), request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    quest = api_owned_quest(quest_id, archived=True)
+    if quest is None:
+        return api_error('Quest not found', 404)
+    return add_validators(jsonify(project(quest.to_dict(), api_fields())), etag)
+
+@app.route('/api/v1/quests/<int:quest_id>', methods=['PATCH'])
+def api_update_quest(quest_id):
+    if 'user_id' not in session:
+        return api_error('Authentication required', 401)
+    quest = api_owned_quest(quest_id)
+    if quest is None:
+        return api_missing_quest(quest_id)
+    
+    try:
+        apply_quest_payload(quest, request.get_json(silent=True) or {})
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return api_error(str(e), 400)
+    
+    bump_data_version(quest.user_id)
+    db.session.commit()
+    return jsonify(quest.to_dict())
+
+@app.route('/api/v1/quests/<int:quest_id>', methods=['DELETE'])
+def api_delete_quest(quest_id):
+    if 'user_id' not in session:
+        return api_error('Authentication required', 401)
+    quest = api_owned_quest(quest_id)
+    if quest is None:
+        return api_missing_quest(quest_id)
+    
+    db.session.delete(quest)
+    bump_data_version(quest.user_id)
+    db.session.commit()
+    return '', 204
+
+@app.route('/api/v1/quests/<int:quest_id>/complete', methods=['POST'])
+def api_complete_quest(quest_id):
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    quest = api_owned_quest(quest_id)
+    if quest is None:
+        return api_missing_quest(quest_id)
+    
+    result = complete_quest_for_user(quest.id, user.id)
+    return jsonify({'quest': quest.to_dict(), 'user': user.to_dict(), 'result': result})
+
+# Bulk quest actions
+BATCH_MAX_ACTIONS = 100
+BATCH_ACTIONS = ('complete', 'delete', 'update')
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+def claim_idempotency_key(user_id, key, request_hash):
+    """
+    Record the key in the current transaction before the request is handled,
+    so a concurrent request with the same key waits for this one to commit
+    Returns:
+        The response to replay (or a 422 if the key was used for another
+        request), or None if the key is new and the request should be handled
+    """
+    existing = db.session.get(IdempotencyKey, (user_id, key))
+    if existing is None:
+        db.session.add(IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash))
+        try:
+            db.session.flush()
+            return None
+        except IntegrityError:
+            # The same key was committed concurrently
+            db.session.rollback()
+            existing = db.session.get(IdempotencyKey, (user_id, key))
+    
+    if existing.request_hash != request_hash:
+        return api_error('Idempotency-Key was already used for a different request', 422)
+    response = app.response_class(existing.response, status=existing.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def purge_idempotency_keys(before=None):
+    """Delete the idempotency keys created before the cutoff (default now - IDEMPOTENCY_KEY_TTL), return the count"""
+    before = before or datetime.utcnow() - IDEMPOTENCY_KEY_TTL
+    deleted = db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.created_at < before)).rowcount
+    db.session.commit()
+    return deleted
+
+def parse_batch_actions(payload):
+    """
+    Validate the actions of a batch request
+    Raises:
+        ValueError: If the actions are malformed
+    """
+    actions = payload.get('actions') if isinstance(payload, dict) else None
+    if not isinstance(actions, list) or not actions:
+        raise ValueError('actions must be a non-empty list')
+    if len(actions) > BATCH_MAX_ACTIONS:
+        raise ValueError(f'At most {BATCH_MAX_ACTIONS} actions per request')
+    seen = set()
+    for index, action in enumerate(actions):
+        if not isinstance(action, dict) or action.get('op') not in BATCH_ACTIONS:
+            raise ValueError(f"actions[{index}]: op must be one of {', '.join(BATCH_ACTIONS)}")
+        if not isinstance(action.get('id'), int) or isinstance(action['id'], bool):
+            raise ValueError(f'actions[{index}]: id must be an integer')
+        if action['id'] in seen:
+            raise ValueError(f"actions[{index}]: quest {action['id']} appears in more than one action")
+        seen.add(action['id'])
+        if action['op'] == 'update' and not isinstance(action.get('fields'), dict):
+            raise ValueError(f'actions[{index}]: fields must be an object')
+    return actions
+
+def apply_quest_batch(user_id, actions):
+    """
+    Apply validated batch actions to the user's quests in the current
+    transaction, completions credited at once by complete_quests_for_user.
+    Nothing is committed.
+    Returns:
+        (body, status, completion) where completion is the result of
+        complete_quests_for_user or None
+    """
+    quests = {quest.id: quest for quest in Quest.query.filter(
+        Quest.id.in_([action['id'] for action in actions]),
+        Quest.user_id == user_id
+    )}
+    missing = [action['id'] for action in actions if action['id'] not in quests]
+    if missing:
+        archived = db.session.execute(db.select(ArchivedQuest.id).where(
+            ArchivedQuest.id.in_(missing),
+            ArchivedQuest.user_id == user_id
+        )).scalars().all()
+        if archived:
+            return {'error': 'Archived quests are read-only', 'ids': sorted(archived)}, 409, None
+        return {'error': 'Quest not found', 'ids': missing}, 404, None
+    
+    for index, action in enumerate(actions):
+        if action['op'] == 'update':
+            try:
+                apply_quest_payload(quests[action['id']], action['fields'])
+            except (ValueError, TypeError) as e:
+                return {'error': f'actions[{index}]: {e}'}, 400, None
+    db.session.flush()
+    
+    completion = None
+    complete_ids = [action['id'] for action in actions if action['op'] == 'complete']
+    if complete_ids:
+        completion = complete_quests_for_user(complete_ids, user_id, commit=False)
+    completed_ids = set(completion['quest_ids']) if completion else set()
+    
+    delete_ids = [action['id'] for action in actions if action['op'] == 'delete']
+    if delete_ids:
+        db.session.execute(db.delete(QuestTag).where(QuestTag.quest_id.in_(delete_ids)))
+        db.session.execute(db.delete(Quest).where(Quest.id.in_(delete_ids)))
+    if delete_ids or len(complete_ids) < len(actions):
+        bump_data_version(user_id)
+    
+    statuses = {'update': 'updated', 'delete': 'deleted'}
+    results = []
+    for action in actions:
+        if action['op'] == 'complete':
+            status = 'completed' if action['id'] in completed_ids else 'already_completed'
+        else:
+            status = statuses[action['op']]
+        results.append({'id': action['id'], 'op': action['op'], 'status': status})
+    
+    return {
+        'results': results,
+        'reward': completion['reward'] if completion else 0,
+        'level_up_message': completion['level_up_message'] if completion else None,
+        'new_achievements': completion['new_achievements'] if completion else [],
+        'daily_completed': completion['daily_completed'] if completion else False
+    }, 200, completion
+
+@app.route('/api/v1/quests/batch', methods=['POST'])
+def api_batch_quests():
+    """
+    Complete, delete and update many quests in one transaction. The body is
+    {"actions": [{"op": "complete"|"delete"|"update", "id": 1, "fields": {...}}]};
+    either every action is applied or none. With an Idempotency-Key header a
+    retried request gets the stored response instead of being applied again.
+    """
+    if 'user_id' not in session:
+        return api_error('Authentication required', 401)
+    user_id = session['user_id']
+    payload = request.get_json(silent=True)
+    try:
+        actions = parse_batch_actions(payload)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    
+    key = request.headers.get('Idempotency-Key')
+    if key is not None:
+        if not key or len(key) > 255:
+            return api_error('Idempotency-Key must be 1 to 255 characters', 400)
+        request_hash = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        replay = claim_idempotency_key(user_id, key, request_hash)
+        if replay is not None:
+            return replay
+    
+    body, status, completion = apply_quest_batch(user_id, actions)
+    if status != 200:
+        # Errors are not stored, the request can be fixed and sent with the same key
+        db.session.rollback()
+        return jsonify(body), status
+    
+    response = jsonify(body)
+    if key is not None:
+        db.session.execute(
+            db.update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(status_code=status, response=response.get_data(as_text=True))
+        )
+    db.session.commit()
+    if completion:
+        announce_completion(user_id, completion)
+    return response, status
+
+@app.route('/api/v1/daily_assignments')
+def api_list_daily_assignments():
+    if 'user_id' not in session:
+        return api_error('Authentication required', 401)
+    etag = make_etag(session['user_id'], user_data_version(session['user_id']), request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    query = DailyQuestAssignment.query.filter_by(user_id=session['user_id'])
+    cursor = request.args.get('cursor')
+    if cursor:
+        last_id = decode_id_cursor(cursor)
+        if last_id is None:
+            return api_error('Invalid cursor', 400)
+        query = query.filter(DailyQuestAssignment.id < last_id)
+    
+    limit = api_page_size()
+    assignments = query.order_by(DailyQuestAssignment.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(assignments) > limit:
+        assignments = assignments[:limit]
+        next_cursor = encode_cursor(assignments[-1].id)
+    
+    fields = api_fields()
+    return add_validators(jsonify({
+        'daily_assignments': [project(assignment.to_dict(), fields) for assignment in assignments],
+        'next_cursor': next_cursor
+    }), etag)
+
+@app.route('/api/v1/achievements')
+def api_list_achievements():
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    etag = make_etag(user.id, user.data_version, request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    
+    unlocked = set(user.get_achievements())
+    return add_validators(jsonify({
+        'achievements': [
+            {'id': achievement_id, 'name': achievement['name'], 'unlocked': achievement_id in unlocked}
+            for achievement_id, achievement in User.ACHIEVEMENTS.items()
+        ]
+    }), etag)
+
+@app.route('/api/v1/leaderboards/<board>', methods=['GET'])
+def api_get_leaderboard(board):
+    if api_current_user() is None:
+        return api_error('Authentication required', 401)
+    if board not in LEADERBOARD_COLUMNS:
+        return api_error('Leaderboard not found', 404)
+    
+    return jsonify({
+        'board': board,
+        'entries': leaderboard_entries(get_leaderboard(board).top(board, api_page_size()))
+    })
+
+@app.route('/api/v1/leaderboards/<board>/me', methods=['GET'])
+def api_get_leaderboard_neighbors(board):
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    if board not in LEADERBOARD_COLUMNS:
+        return api_error('Leaderboard not found', 404)
+    
+    k = min(max(request.args.get('k', 5, type=int), 0), API_MAX_PAGE_SIZE)
+    rank = get_rank(board, user)
+    return jsonify({
+        'board': board,
+        'rank': rank,
+        'entries': leaderboard_entries(leaderboard.around(board, user.id, k))
+    })
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_IMPORT_ERRORS = 100
+EXPORT_BATCH_SIZE = 1000
+
+def insert_quest_batch(user_id, rows):
+    """
+    Insert validated quest values (see quest_io.quest_values) and their tags, in one transaction
+    Raises:
+        RuntimeError: If the ids of the inserted quests could not be read
+            back; nothing is committed
+    """
+    created_at = datetime.utcnow()
+    quest_rows = []
+    for values in rows:
+        tags = values['tags']
+        quest_rows.append(dict(
+            values,
+            tags=json.dumps(tags),
+            kind=QUEST_KIND_DAILY if QUEST_KIND_DAILY in tags else QUEST_KIND_SIDE,
+            user_id=user_id,
+            created_at=created_at,
+            completed=False
+        ))
+    connection = db.session.connection()
+    statement = Quest.__table__.insert()
+    if any(values['tags'] for values in rows):
+        if connection.dialect.name == 'sqlite':
+            # SQLite can't keep RETURNING in parameter order without inserting the
+            # rows one at a time, but AUTOINCREMENT ids grow in insertion order
+            quest_ids = sorted(connection.execute(statement.returning(Quest.id), quest_rows).scalars())
+        else:
+            quest_ids = connection.execute(
+                statement.returning(Quest.id, sort_by_parameter_order=True), quest_rows
+            ).scalars().all()
+        if len(quest_ids) != len(rows):
+            db.session.rollback()
+            raise RuntimeError('Could not read back the ids of the imported quests')
+        connection.execute(QuestTag.__table__.insert(), [
+            {'quest_id': quest_id, 'tag': tag}
+            for quest_id, values in zip(quest_ids, rows)
+            for tag in dict.fromkeys(values['tags'])
+        ])
+    else:
+        connection.execute(statement, quest_rows)
+    bump_data_version(user_id)
+    db.session.commit()
+
+def import_quests(user_id, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import quests from CSV or JSONL text lines, read incrementally. Valid
+    rows are inserted in transactions of batch_size rows, invalid rows are
+    skipped and reported.
+    Returns:
+        dict with the imported and failed counts and the first errors as
+        {'line', 'error'}
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+    
+    def fail(line, error):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_IMPORT_ERRORS:
+            report['errors'].append({'line': line, 'error': error})
+    
+    def insert(batch):
+        try:
+            insert_quest_batch(user_id, [values for _, values in batch])
+        except RuntimeError as e:
+            # The batch was rolled back, its rows are reported like invalid ones
+            for line, _ in batch:
+                fail(line, str(e))
+        else:
+            report['imported'] += len(batch)
+    
+    batch = []
+    for line, record, error in iter_records(stream, fmt):
+        if error is None:
+            try:
+                batch.append((line, quest_values(record)))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            fail(line, error)
+            continue
+        if len(batch) >= batch_size:
+            insert(batch)
+            batch = []
+    if batch:
+        insert(batch)
+    return report
+
+def iter_quest_export_rows(user_id, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the user's quests, then their archived quests, as EXPORT_FIELDS tuples fetched in keyset batches by id"""
+    for model in (Quest, ArchivedQuest):
+        columns = [getattr(model, field) for field in EXPORT_FIELDS]
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(*columns)
+                .where(model.user_id == user_id, model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            yield from rows
+            last_id = rows[-1][0]
+
+@app.route('/api/v1/quests/import', methods=['POST'])
+def api_import_quests():
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    
+    # Either a multipart upload in the 'file' field or the raw request body
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(content_type=request.mimetype)
+    if fmt not in IMPORT_FORMATS:
+        return api_error('Unknown format, use ?format=csv or ?format=jsonl', 400)
+    
+    try:
+        report = import_quests(user.id, decode_lines(stream), fmt)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return api_error('The file is not UTF-8 text', 400)
+    return jsonify(report), 200 if report['imported'] or not report['failed'] else 400
+
+@app.route('/api/v1/quests/export', methods=['GET'])
+def api_export_quests():
+    user = api_current_user()
+    if user is None:
+        return api_error('Authentication required', 401)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in IMPORT_FORMATS:
+        return api_error('Unknown format, use ?format=csv or ?format=jsonl', 400)
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(export_lines(iter_quest_export_rows(user.id), fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=quests.{fmt}'}
+    )
+
+@app.cli.command('import-quests')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username the quests are imported for.')
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='File format (default: from the file extension).')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Quests inserted per transaction.')
+def import_quests_command(path, username, fmt, batch_size):
+    """Import quests from a CSV or JSONL file."""
+    user_id = db.session.scalar(db.select(User.id).where(User.username == username))
+    if user_id is None:
+        raise click.ClickException(f'Unknown user: {username}')
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.ClickException('Unknown file format, pass --format csv or --format jsonl')
+    
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        report = import_quests(user_id, f, fmt, batch_size)
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"Imported {report['imported']} quests, {report['failed']} rows failed.")
+
+@app.cli.command('export-quests')
+@click.option('--user', 'username', required=True, help='Username whose quests are exported.')
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default='csv', show_default=True)
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Output file (default: stdout).')
+def export_quests_command(username, fmt, output):
+    """Export a user's quests as CSV or JSONL."""
+    user_id = db.session.scalar(db.select(User.id).where(User.username == username))
+    if user_id is None:
+        raise click.ClickException(f'Unknown user: {username}')
+    for line in export_lines(iter_quest_export_rows(user_id), fmt):
+        output.write(line)
+
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+ARCHIVE_CHUNK_SIZE = 1000
+
+def archive_quests(before=None, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Move quests completed before the cutoff, and daily quests created before it
+    that were never completed, to the archive table in chunks of chunk_size,
+    one transaction per chunk
+    Args:
+        before: Cutoff datetime (default now - ARCHIVE_AFTER_DAYS, UTC)
+        chunk_size: Quests moved per transaction
+    Returns:
+        Number of quests archived
+    Raises:
+        RuntimeError: If the archive holds a different quest with the id of
+            one being archived; the chunk is rolled back
+    """
+    if before is None:
+        before = datetime.utcnow() - timedelta(days=app.config['ARCHIVE_AFTER_DAYS'])
+    columns = [column for column in Quest.__table__.columns if column.name in ArchivedQuest.__table__.columns]
+    archivable = or_(
+        and_(Quest.completed == True, Quest.completion_date < before),
+        and_(or_(Quest.completed.is_(None), Quest.completed == False),
+             Quest.kind == QUEST_KIND_DAILY, Quest.created_at < before)
+    )
+    
+    archived = 0
+    last_id = 0
+    while True:
+        # Walk the primary key so every chunk only scans past the previous one
+        rows = db.session.execute(
+            db.select(*columns).where(Quest.id > last_id, archivable).order_by(Quest.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            return archived
+        ids = [row['id'] for row in rows]
+        archived_at = datetime.utcnow()
+        archive_rows = [dict(row, archived_at=archived_at) for row in rows]
+        
+        # Ignoring conflicts makes a chunk safe to redo if the archive is a separate
+        # database that committed while the quest table did not
+        archive = db.session.connection(bind_arguments={'mapper': ArchivedQuest.__mapper__})
+        statement = upsert(ArchivedQuest)
+        if statement is not None:
+            stored = set(archive.execute(
+                statement.on_conflict_do_nothing().returning(ArchivedQuest.id), archive_rows
+            ).scalars())
+        else:
+            archive.execute(db.insert(ArchivedQuest), archive_rows)
+            stored = set(ids)
+        
+        # Only quests the archive holds are deleted: a conflict is either the
+        # same quest from a redone chunk, or a different quest with the same id,
+        # which would be lost
+        conflicts = {row['id']: row for row in rows if row['id'] not in stored}
+        if conflicts:
+            archived_rows = archive.execute(
+                db.select(*[ArchivedQuest.__table__.c[column.name] for column in columns])
+                .where(ArchivedQuest.id.in_(list(conflicts)))
+            ).mappings()
+            for archived_row in archived_rows:
+                if dict(archived_row) != dict(conflicts[archived_row['id']]):
+                    db.session.rollback()
+                    raise RuntimeError(f"Quest {archived_row['id']} conflicts with a different archived quest")
+                stored.add(archived_row['id'])
+        
+        stored_ids = [quest_id for quest_id in ids if quest_id in stored]
+        if stored_ids:
+            db.session.execute(db.delete(QuestTag).where(QuestTag.quest_id.in_(stored_ids)))
+            db.session.execute(db.delete(Quest).where(Quest.id.in_(stored_ids)))
+            # The completed counts are on the cached dashboards
+            user_ids = {row['user_id'] for row in rows if row['id'] in stored}
+            db.session.execute(
+                db.update(User).where(User.id.in_(user_ids)).values(data_version=User.data_version + 1)
+            )
+        db.session.commit()
+        
+        archived += len(stored_ids)
+        last_id = ids[-1]
+
+@app.cli.command('archive-quests')
+@click.option('--days', type=int, default=None, help='Archive quests older than this many days (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--chunk-size', default=ARCHIVE_CHUNK_SIZE, show_default=True, help='Quests moved per transaction.')
+def archive_quests_command(days, chunk_size):
+    """Move old completed quests and expired daily quests to the archive."""
+    days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    archived = archive_quests(datetime.utcnow() - timedelta(days=days), chunk_size)
+    click.echo(f'Archived {archived} quests older than {days} days.')
+
+@app.cli.command('recompute-levels')
+@click.option('--batch-size', default=50000, show_default=True, help='Users updated per statement batch.')
+def recompute_levels_command(batch_size):
+    """Recompute every user's level from their points with the current level curve."""
+    import numpy as np
+    
+    rows = db.session.query(User.id, User.points, User.level).order_by(User.id).all()
+    if not rows:
+        click.echo('No users to update.')
+        return
+    
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    points = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    levels = np.fromiter((row[2] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    
+    thresholds = np.asarray(LEVEL_CURVE.thresholds_up_to(int(points.max())), dtype=np.int64)
+    new_levels = np.searchsorted(thresholds, np.maximum(points, 0), side='right')
+    
+    changed = np.nonzero(new_levels != levels)[0]
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        db.session.execute(
+            db.update(User),
+            [{'id': int(ids[i]), 'level': int(new_levels[i])} for i in batch]
+        )
+        # The level is on the cached pages
+        db.session.execute(
+            db.update(User).where(User.id.in_([int(ids[i]) for i in batch])).values(data_version=User.data_version + 1)
+        )
+    db.session.commit()
+    click.echo(f'Recomputed levels for {len(rows)} users, {len(changed)} changed.')
+
+@app.cli.command('rollover-week')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Any day of the new week (default: today, UTC).')
+def rollover_week_command(day):
+    """Reset every user's weekly points for the week containing the date."""
+    day = day.date() if day else None
+    click.echo(f'Rolled over the weekly points of {rollover_week(day)} users.')
+
+@app.cli.command('backfill-achievements')
+@click.option('--batch-size', default=1000, show_default=True, help='Users per batch.')
+def backfill_achievements_command(batch_size):
+    """Unlock the achievements users have already reached, after adding or changing a rule."""
+    click.echo(f'Unlocked {backfill_achievements(batch_size)} achievements.')
+
+@app.cli.command('decay-streaks')
+def decay_streaks_command():
+    """Refresh the users' UTC offsets and reset the streaks broken by a missed local day."""
+    refreshed = refresh_utc_offsets()
+    click.echo(f'Updated the UTC offset of {refreshed} users, reset {decay_streaks()} streaks.')
+
+def initialize_quest_templates():
+    """Initialize the database with quest templates if they don't exist"""
+    with app.app_context():
+        if DailyQuestTemplate.query.count() == 0:
             for category, quests in DAILY_QUEST_TEMPLATES.items():
                 for quest in quests:
                     template = DailyQuestTemplate(
@@ -738,131 +2526,437 @@ def initialize_quest_templates():
                     db.session.add(template)
             db.session.commit()
 
-def get_daily_training_category(user_id):
-    """Determine the training category for the day"""
-    # Get the user's last assignment
-    last_assignment = DailyQuestAssignment.query.filter_by(
-        user_id=user_id
-    ).order_by(DailyQuestAssignment.assigned_date.desc()).first()
-    
-    # List of all categories
-    categories = list(DAILY_QUEST_TEMPLATES.keys())
-    
-    if not last_assignment:
-        # If no previous assignment, randomly choose a category
-        return random.choice(categories)
+def generate_daily_quests(user_id):
+    """Generate daily quests for a user if the nightly job has not done it yet"""
+    try:
+        generate_daily_quests_batch(user_id, user_id, date.today())
+    except IntegrityError:
+        # Another request or the nightly job generated them concurrently
+        db.session.rollback()
+
+def load_daily_quest_templates():
+    """Load all daily quest templates as plain dicts grouped by category"""
+    templates_by_category = {}
+    for template in DailyQuestTemplate.query.all():
+        templates_by_category.setdefault(template.category, []).append({
+            'name': template.name,
+            'description': template.description,
+            'target': template.target,
+            'unit': template.unit,
+            'duration': template.duration,
+            'difficulty': template.difficulty,
+            'base_reward': template.base_reward
+        })
+    return templates_by_category
+
+def get_last_daily_categories(first_user_id, last_user_id):
+    """Get the category of the latest assignment of every user in an id range"""
+    latest = db.session.query(
+        DailyQuestAssignment.user_id,
+        func.max(DailyQuestAssignment.assigned_date).label('assigned_date')
+    ).filter(
+        DailyQuestAssignment.user_id.between(first_user_id, last_user_id)
+    ).group_by(DailyQuestAssignment.user_id).subquery()
     
-    # Remove the last category from the list to avoid repetition
-    categories.remove(last_assignment.category)
-    return random.choice(categories)
+    rows = db.session.query(DailyQuestAssignment.user_id, DailyQuestAssignment.category).join(
+        latest, and_(
+            DailyQuestAssignment.user_id == latest.c.user_id,
+            DailyQuestAssignment.assigned_date == latest.c.assigned_date
+        )
+    )
+    return dict(rows.all())
 
-def generate_daily_quests(user_id):
-    """Generate daily quests for a user"""
-    today = date.today()
-    user = User.query.get(user_id)
+def generate_daily_quests_batch(first_user_id, last_user_id, day, templates_by_category=None):
+    """
+    Generate the daily assignment and quests for every user in an id range
+    that does not have them for the given day yet, using bulk inserts
+    Args:
+        first_user_id: First user id of the range (inclusive)
+        last_user_id: Last user id of the range (inclusive)
+        day: The date to generate quests for
+        templates_by_category: Optional preloaded {category: [template, ...]}
+    Returns:
+        Number of users quests were generated for
+    """
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+        User.id.between(first_user_id, last_user_id),
+        or_(User.last_daily_quest_date.is_(None), User.last_daily_quest_date < day)
+    )]
+    if not user_ids:
+        return 0
     
-    # Check if user already has quests for today
-    if user.last_daily_quest_date == today:
-        return
+    if templates_by_category is None:
+        templates_by_category = load_daily_quest_templates()
+    last_categories = get_last_daily_categories(first_user_id, last_user_id)
+    categories = list(DAILY_QUEST_TEMPLATES.keys())
     
-    # Get training category for today
-    category = get_daily_training_category(user_id)
+    due_date = datetime.combine(day, datetime.max.time())  # End of the day
+    created_at = max(datetime.utcnow(), datetime.combine(day, datetime.min.time()))
+    assignment_rows = []
+    quest_rows = []
+    quest_categories = []
+    for user_id in user_ids:
+        # Avoid repeating the category of the previous assignment
+        choices = [category for category in categories if category != last_categories.get(user_id)]
+        category = random.choice(choices or categories)
+        assignment_rows.append({
+            'user_id': user_id,
+            'assigned_date': day,
+            'category': category,
+            'completed': False
+        })
+        for template in templates_by_category.get(category, []):
+            quest_rows.append({
+                'name': template['name'],
+                'description': template['description'],
+                'target': template['target'],
+                'unit': template['unit'],
+                'duration': template['duration'],
+                'difficulty': template['difficulty'],
+                'reward': template['base_reward'],
+                'user_id': user_id,
+                'tags': json.dumps([category, QUEST_KIND_DAILY]),
+                'kind': QUEST_KIND_DAILY,
+                'created_at': created_at,
+                'due_date': due_date,
+                'priority': 3  # Medium-high priority for daily quests
+            })
+            quest_categories.append(category)
     
-    # Create daily quest assignment
-    assignment = DailyQuestAssignment(
-        user_id=user_id,
-        assigned_date=today,
-        category=category,
-        completed=False
+    db.session.execute(db.insert(DailyQuestAssignment), assignment_rows)
+    if quest_rows:
+        quest_ids = db.session.scalars(db.insert(Quest).returning(Quest.id, sort_by_parameter_order=True), quest_rows).all()
+        db.session.execute(db.insert(QuestTag), [
+            {'quest_id': quest_id, 'tag': tag}
+            for quest_id, category in zip(quest_ids, quest_categories)
+            for tag in (category, QUEST_KIND_DAILY)
+        ])
+    db.session.execute(
+        db.update(User).where(User.id.in_(user_ids)).values(
+            last_daily_quest_date=day,
+            data_version=User.data_version + 1
+        )
     )
-    db.session.add(assignment)
-    
-    # Get quest templates for the category
-    templates = DailyQuestTemplate.query.filter_by(category=category).all()
+    db.session.commit()
+    return len(user_ids)
+
+def generate_all_daily_quests(day, batch_size=1000):
+    """Generate daily quests for every user in batches of user ids, return the number of users"""
+    first_user_id, last_user_id = db.session.query(func.min(User.id), func.max(User.id)).one()
+    if first_user_id is None:
+        return 0
+    return generate_daily_quests_range(first_user_id, last_user_id, day, batch_size)
+
+def generate_daily_quests_range(first_user_id, last_user_id, day, batch_size=1000):
+    """Generate daily quests for the users in an id range (inclusive), one batch at a time"""
+    templates_by_category = load_daily_quest_templates()
+    generated = 0
+    for batch_start in range(first_user_id, last_user_id + 1, batch_size):
+        batch_end = min(batch_start + batch_size - 1, last_user_id)
+        try:
+            generated += generate_daily_quests_batch(batch_start, batch_end, day, templates_by_category)
+        except IntegrityError:
+            # Another process generated some of these users' quests first,
+            # the second attempt only sees the users still missing them
+            db.session.rollback()
+            generated += generate_daily_quests_batch(batch_start, batch_end, day, templates_by_category)
+    return generated
+
+def _generate_daily_quests_shard(args):
+    """Process pool entry point, generates the dailies of one user id shard"""
+    first_user_id, last_user_id, day, batch_size = args
+    with app.app_context():
+        # Never reuse connections inherited from the parent process
+        db.engine.dispose()
+        return generate_daily_quests_range(first_user_id, last_user_id, day, batch_size)
+
+@app.cli.command('describe-templates')
+@click.option('--overwrite', is_flag=True, help='Replace the stored template descriptions with the generated ones.')
+def describe_templates_command(overwrite):
+    """Generate descriptions for every daily quest template in batched prompts, warming the description cache."""
+    templates = DailyQuestTemplate.query.all()
+    descriptions = generate_descriptions([template.name for template in templates])
     
-    # Create quests from templates
+    updated = 0
     for template in templates:
-        quest = Quest(
-            name= template.name,
-            description=template.description,
-            target=template.target,
-            unit=template.unit,
-            duration=template.duration,
-            difficulty=template.difficulty,
-            reward=template.base_reward,
-            user_id=user_id,
-            tags=json.dumps([category, 'daily']),
-            due_date=datetime.combine(today, datetime.max.time()),  # End of today
-            priority=3  # Medium-high priority for daily quests
-        )
-        db.session.add(quest)
-    
-    user.last_daily_quest_date = today
+        description = descriptions.get(template.name)
+        if overwrite and description and description != DESCRIPTION_FAILED:
+            template.description = description
+            updated += 1
     db.session.commit()
+    failed = sum(1 for description in descriptions.values() if description == DESCRIPTION_FAILED)
+    click.echo(f'Generated {len(descriptions) - failed} descriptions ({failed} failed), updated {updated} templates.')
 
-def check_daily_quest_completion(user_id):
-    """Check if all daily quests for today are completed"""
-    today = date.today()
-    daily_quests = Quest.query.filter(
-        Quest.user_id == user_id,
-        Quest.created_at >= today,
-        Quest.tags.like('%"daily"%')
-    ).all()
+@app.cli.command('generate-dailies')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Date to generate quests for (default: today).')
+@click.option('--batch-size', default=1000, show_default=True, help='Users per insert batch.')
+@click.option('--workers', default=1, show_default=True, help='Processes to shard the user id range across.')
+def generate_dailies_command(day, batch_size, workers):
+    """Generate today's daily quests for every user. Safe to run more than once per day."""
+    day = day.date() if day else date.today()
+    first_user_id, last_user_id = db.session.query(func.min(User.id), func.max(User.id)).one()
+    if first_user_id is None:
+        click.echo('No users to generate daily quests for.')
+        return
     
-    if not daily_quests:
-        return False
+    if workers <= 1:
+        generated = generate_daily_quests_range(first_user_id, last_user_id, day, batch_size)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        shard_size = -(-(last_user_id - first_user_id + 1) // workers)
+        shards = [
+            (start, min(start + shard_size - 1, last_user_id), day, batch_size)
+            for start in range(first_user_id, last_user_id + 1, shard_size)
+        ]
+        db.engine.dispose()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            generated = sum(executor.map(_generate_daily_quests_shard, shards))
+    click.echo(f'Generated daily quests for {generated} users on {day.isoformat()}.')
+
+# Only the process holding this lock runs the scheduled jobs, see
+# start_daily_quest_scheduler
+scheduler_leader = LeaderLock(
+    os.getenv('SCHEDULER_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'the-system-scheduler.lock'))
+)
+
+def start_daily_quest_scheduler(app):
+    """
+    Run generate_all_daily_quests, rollover_week, archive_quests and
+    purge_idempotency_keys shortly after every midnight in a background
+    thread, and refresh_utc_offsets and decay_streaks every
+    DECAY_INTERVAL_MINUTES in another.
     
-    all_completed = all(quest.completed for quest in daily_quests)
-    if all_completed:
-        # Mark the daily assignment as completed
-        assignment = DailyQuestAssignment.query.filter_by(
-            user_id=user_id,
-            assigned_date=today
-        ).first()
-        if assignment:
-            assignment.completed = True
-            db.session.commit()
+    Every gunicorn worker starts the threads, but only the one holding
+    scheduler_leader runs the jobs; another worker takes over if it dies.
+    The lock is per host: with several hosts the jobs run on each of them,
+    which they tolerate since all are idempotent.
+    """
+    def run():
+        while True:
+            now = datetime.now()
+            next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) + timedelta(minutes=1)
+            time.sleep((next_run - now).total_seconds())
+            if not scheduler_leader.is_leader():
+                continue
+            with app.app_context():
+                try:
+                    generate_all_daily_quests(date.today())
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error generating daily quests: {str(e)}")
+                try:
+                    # Idempotent, so it simply runs every night
+                    rollover_week()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error rolling over weekly points: {str(e)}")
+                try:
+                    archive_quests()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error archiving quests: {str(e)}")
+                try:
+                    purge_idempotency_keys()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error purging idempotency keys: {str(e)}")
     
-    return all_completed
+    def run_streaks():
+        # Local midnights come every quarter hour somewhere, see DECAY_INTERVAL_MINUTES
+        interval = DECAY_INTERVAL_MINUTES * 60
+        while True:
+            time.sleep(interval - time.time() % interval + 30)
+            if not scheduler_leader.is_leader():
+                continue
+            with app.app_context():
+                try:
+                    refresh_utc_offsets()
+                    decay_streaks()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error decaying streaks: {str(e)}")
+    
+    thread = threading.Thread(target=run, name='daily-quest-scheduler', daemon=True)
+    thread.start()
+    threading.Thread(target=run_streaks, name='streak-decay-scheduler', daemon=True).start()
+    return thread
+
+DESCRIPTION_MODEL_NAME = "gemini-exp-1114"
+DESCRIPTION_GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.75,
+    "top_k": 44,
+    "max_output_tokens": 254,
+    "response_mime_type": "text/plain",
+}
+DESCRIPTION_PROMPT = (
+    "Generate a single direct quest description for the quest titled: '{quest_title}'. "
+    "Make it brief (2-3 sentences), direct and real-world-based experience,  "
+    "Focus on the challenge and potential rewards. The last 2 sentences should be direct steps that will guide the player on the task"
+)
+DESCRIPTION_FAILED = "Failed to generate description."
+
+app.config['DESCRIPTION_CACHE_SIZE'] = int(os.getenv('DESCRIPTION_CACHE_SIZE', 1024))
+app.config['DESCRIPTION_CACHE_TTL'] = int(os.getenv('DESCRIPTION_CACHE_TTL', 24 * 3600))
+app.config['DESCRIPTION_CACHE_MAX_ENTRIES'] = int(os.getenv('DESCRIPTION_CACHE_MAX_ENTRIES', 10000))
+
+app.config['DESCRIPTION_MODEL_NAME'] = DESCRIPTION_MODEL_NAME
+app.config['DESCRIPTION_GENERATION_CONFIG'] = DESCRIPTION_GENERATION_CONFIG
+
+# Cached descriptions are only reused for the same backend, model, config and prompt
+DESCRIPTION_CONFIG_HASH = config_hash(app.config['LLM_BACKEND'], DESCRIPTION_MODEL_NAME,
+                                      DESCRIPTION_GENERATION_CONFIG, DESCRIPTION_PROMPT)
+description_cache = DescriptionCache(
+    TTLCache(app.config['DESCRIPTION_CACHE_SIZE'], app.config['DESCRIPTION_CACHE_TTL']),
+    SQLDescriptionStore(lambda: db.engine, DescriptionCacheEntry.__table__,
+                        max_entries=app.config['DESCRIPTION_CACHE_MAX_ENTRIES']),
+    listener=metrics.cache_listener('description_cache')
+)
+
+# Cap on concurrent upstream generations across all workers of this host, so
+# slow LLM calls can't tie up every worker
+app.config['DESCRIPTION_MAX_CONCURRENT'] = int(os.getenv('DESCRIPTION_MAX_CONCURRENT', 4))
+app.config['DESCRIPTION_SLOT_WAIT'] = float(os.getenv('DESCRIPTION_SLOT_WAIT', 1))
+app.config['DESCRIPTION_TIMEOUT'] = float(os.getenv('DESCRIPTION_TIMEOUT', 20))
+description_slots = SlotLimiter(
+    os.getenv('DESCRIPTION_SLOT_DIR', os.path.join(tempfile.gettempdir(), 'the-system-description-slots')),
+    app.config['DESCRIPTION_MAX_CONCURRENT']
+)
+
+class DescriptionBusyError(Exception):
+    """Raised when every description generation slot is in use"""
+    message = 'Too many descriptions are being generated, please try again shortly.'
+
+    def __init__(self):
+        super().__init__(self.message)
+
+# Concurrent requests for the same title share one upstream call
+description_flight = SingleFlight()
+
+# Titles sent to the model per batched prompt
+DESCRIPTION_BATCH_SIZE = 20
+DESCRIPTION_BATCH_PROMPT = (
+    "Generate a quest description for each of the quest titles below. "
+    "For every title, make it brief (2-3 sentences), direct and real-world-based experience, "
+    "Focus on the challenge and potential rewards. The last 2 sentences should be direct steps that will guide the player on the task. "
+    "Answer with a JSON object mapping each title, exactly as written, to its description.\n\n"
+    "Titles:\n{titles}"
+)
+
+_llm_backend = None
+
+def get_llm_backend():
+    """Get the description generation backend, created once per worker"""
+    global _llm_backend
+    if _llm_backend is None:
+        _llm_backend = metrics.instrument_backend(create_backend(app.config))
+    return _llm_backend
 
 def generate_description(quest_title: str):
     """Generate a short, stylized quest description based on the quest title, with a gamified and Solo Leveling-inspired theme.
     
+    Descriptions are served from description_cache when the same (normalized)
+    title was already generated with the current model config.
+    
     Args:
         quest_title (str): The title of the quest to generate a description for
+    
+    Raises:
+        DescriptionBusyError: If no generation slot frees up within DESCRIPTION_SLOT_WAIT seconds
     """
-    try:
-        # Create the model
-        generation_config = {
-            "temperature": 1,
-            "top_p": 0.75,
-            "top_k": 44,
-            "max_output_tokens": 254,
-            "response_mime_type": "text/plain",
-        }
-        
-        model = genai.GenerativeModel(
-            model_name="gemini-exp-1114",
-            generation_config=generation_config,
-        )
-        
-        chat_session = model.start_chat(history=[])
-        prompt = (
-            f"Generate a single direct quest description for the quest titled: '{quest_title}'. "
-            "Make it brief (2-3 sentences), direct and real-world-based experience,  "
-            "Focus on the challenge and potential rewards. The last 2 sentences should be direct steps that will guide the player on the task"
-        )
-        
-        response = chat_session.send_message(prompt)
-        
-        # Extract the text content from the response
-        if response.text:
-            return response.text.strip()
-        return "Failed to generate description."
-        
-    except Exception as e:
-        print(f"Error generating description: {str(e)}")
-        return "Failed to generate description."
+    key = cache_key(quest_title, DESCRIPTION_CONFIG_HASH)
+    cached = description_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    return description_flight.do(key, lambda: generate_uncached_description(quest_title, key))
+
+def generate_uncached_description(quest_title, key):
+    """Call the model for a description and cache it, see generate_description"""
+    with description_slots.slot(app.config['DESCRIPTION_SLOT_WAIT']) as acquired:
+        if not acquired:
+            raise DescriptionBusyError()
+        try:
+            text = get_llm_backend().generate(
+                DESCRIPTION_PROMPT.format(quest_title=quest_title),
+                timeout=app.config['DESCRIPTION_TIMEOUT']
+            )
+            
+            if text and text.strip():
+                description = text.strip()
+                description_cache.set(key, quest_title[:200], description)
+                return description
+            return DESCRIPTION_FAILED
+            
+        except Exception as e:
+            print(f"Error generating description: {str(e)}")
+            return DESCRIPTION_FAILED
+
+def generate_descriptions(quest_titles):
+    """
+    Generate descriptions for many quest titles, asking the model for all
+    uncached titles at once in batches of DESCRIPTION_BATCH_SIZE
+    Args:
+        quest_titles: List of quest titles
+    Returns:
+        dict of title -> description (DESCRIPTION_FAILED for titles that failed)
+    Raises:
+        DescriptionBusyError: If no generation slot frees up in time
+    """
+    descriptions = {}
+    missing = {}
+    for title in dict.fromkeys(quest_titles):
+        key = cache_key(title, DESCRIPTION_CONFIG_HASH)
+        cached = description_cache.get(key)
+        if cached is not None:
+            descriptions[title] = cached
+        else:
+            missing[title] = key
+    
+    titles = list(missing)
+    for start in range(0, len(titles), DESCRIPTION_BATCH_SIZE):
+        batch = titles[start:start + DESCRIPTION_BATCH_SIZE]
+        generated = generate_description_batch(batch)
+        for title in batch:
+            description = generated.get(title)
+            if description:
+                description_cache.set(missing[title], title[:200], description)
+                descriptions[title] = description
+            else:
+                descriptions[title] = DESCRIPTION_FAILED
+    return descriptions
+
+def generate_description_batch(quest_titles):
+    """Ask the model for the descriptions of several titles in one structured prompt"""
+    generation_config = dict(
+        DESCRIPTION_GENERATION_CONFIG,
+        response_mime_type="application/json",
+        max_output_tokens=min(8192, DESCRIPTION_GENERATION_CONFIG["max_output_tokens"] * len(quest_titles)),
+    )
+    prompt = DESCRIPTION_BATCH_PROMPT.format(titles="\n".join(f"- {title}" for title in quest_titles))
+    
+    with description_slots.slot(app.config['DESCRIPTION_SLOT_WAIT']) as acquired:
+        if not acquired:
+            raise DescriptionBusyError()
+        try:
+            generated = json.loads(get_llm_backend().generate(
+                prompt,
+                generation_config=generation_config,
+                timeout=app.config['DESCRIPTION_TIMEOUT']
+            ))
+        except Exception as e:
+            print(f"Error generating descriptions: {str(e)}")
+            return {}
+    
+    if not isinstance(generated, dict):
+        return {}
+    return {
+        title: description.strip()
+        for title, description in generated.items()
+        if isinstance(description, str) and description.strip()
+    }
 
 # def generate_description(quest_title):
 #     # Create the model
@@ -913,27 +3007,37 @@ def generate_description(quest_title: str):
 
 
 def init_db():
-    with app.app_context():
-        db.create_all()
-        initialize_quest_templates()
-        
-        if not User.query.first():
-            default_user = User(
-                username="demo",
-                password_hash=generate_password_hash("demo123")
-            )
-            db.session.add(default_user)
-            db.session.commit()
+    """Create the tables and seed the quest templates and the demo user"""
+    db.create_all()
+    initialize_quest_templates()
+    
+    # Only select the id, so this also works before new columns are migrated
+    if db.session.query(User.id).first() is None:
+        default_user = User(
+            username="demo",
+            password_hash=generate_password_hash("demo123")
+        )
+        db.session.add(default_user)
+        db.session.commit()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database tables and seed the quest templates and demo user."""
+    init_db()
+    click.echo('Database initialized.')
 
 def init_app(app):
-    with app.app_context():
-        db.create_all()
-        init_db()
+    """
+    Start the background jobs of a worker process. Importing the module does
+    no database work, run `flask db upgrade && flask init-db` once per release.
+    """
+    if os.getenv('DAILY_QUEST_SCHEDULER') == '1':
+        start_daily_quest_scheduler(app)
 
 if __name__ == '__main__':
+    with app.app_context():
+        init_db()
     init_app(app)
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
     app.run(debug=True)
-else:
-    init_app(app)
@@ -0,0 +1,106 @@
+"""Import-time benchmark for app.py.
+
+Imports the app in fresh interpreters and reports the wall time percentiles,
+plus the slowest modules from `python -X importtime` of the last run:
+
+    python benchmarks/bench_import.py --runs 10
+
+Each gunicorn master pays this once at boot, and `flask` CLI commands on every
+invocation. --max-ms exits non-zero when the median is above a budget, and
+--output saves the results as JSON, to track regressions. The run also fails
+if importing the app loads a module listed in LAZY_MODULES.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules that must only be imported on first use
+LAZY_MODULES = ['google.generativeai', 'numpy', 'flask_migrate', 'redis']
+
+IMPORT_SCRIPT = (
+    'import json, sys, time\n'
+    'start = time.perf_counter()\n'
+    'import app\n'
+    'elapsed = time.perf_counter() - start\n'
+    'print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))\n'
+)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_import(root, importtime=False):
+    env = dict(os.environ)
+    env.setdefault('GEMINI_API_KEY', 'benchmark')
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', IMPORT_SCRIPT]
+    result = subprocess.run(command, cwd=root, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_modules(importtime_output, top):
+    """Parse `-X importtime` lines into the top modules by cumulative time"""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        modules.append({'module': name, 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    return sorted(modules, key=lambda module: module['cumulative_ms'], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if the median import time is above this')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(args.runs):
+        result, _ = run_import(root)
+        timings.append(result['seconds'] * 1000)
+    result, importtime_output = run_import(root, importtime=True)
+    loaded_lazy_modules = [module for module in LAZY_MODULES if module in result['modules']]
+
+    timings.sort()
+    results = {
+        'runs': args.runs,
+        'median_ms': percentile(timings, 0.5),
+        'p95_ms': percentile(timings, 0.95),
+        'min_ms': timings[0],
+        'max_ms': timings[-1],
+        'modules_loaded': len(result['modules']),
+        'loaded_lazy_modules': loaded_lazy_modules,
+        'slowest_modules': slowest_modules(importtime_output, args.top),
+    }
+
+    print(f"import app: median {results['median_ms']:.1f} ms, p95 {results['p95_ms']:.1f} ms, "
+          f"min {results['min_ms']:.1f} ms over {args.runs} runs, {results['modules_loaded']} modules")
+    for module in results['slowest_modules']:
+        print(f"  {module['cumulative_ms']:8.1f} ms  {module['module']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if loaded_lazy_modules:
+        print(f"FAIL: importing the app loaded {', '.join(loaded_lazy_modules)}")
+        failed = True
+    if args.max_ms is not None and results['median_ms'] > args.max_ms:
+        print(f"FAIL: median import time above {args.max_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
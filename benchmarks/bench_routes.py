@@ -0,0 +1,442 @@
+"""Route benchmark on a synthetic dataset.
+
+Seeds a fresh SQLite database with synthetic users and quests, then drives
+the main pages through the Flask test client and through a real multi-worker
+gunicorn, and reports latency percentiles, throughput and SQL queries per
+request for every route:
+
+    python benchmarks/bench_routes.py --users 10000 --quests-per-user 100 --output results.json
+
+Routes:
+    generate_daily_quests  GET /quests on a user's first visit of the day, which
+                           generates their daily quests
+    dashboard              GET /dashboard
+    quests                 GET /quests once the daily quests exist
+    add_quest              POST /add_quest
+    complete_quest         POST /complete_quest/<id> of an open side quest
+
+Each user has --quests-per-user quests over the last --days days, a
+--daily-fraction of them daily quests; 80% of the dailies and 70% of the side
+quests are completed. SQL query counts are only measured through the test
+client, which runs in this process. Requests carry a session cookie signed
+with the app's key, so no time is spent logging in.
+
+--output saves the results as JSON, with the git commit they were measured
+at, and --compare prints the change against an earlier results file.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = ['generate_daily_quests', 'dashboard', 'quests', 'add_quest', 'complete_quest']
+
+SIDE_QUEST_NAMES = ['Read a chapter', 'Clean the desk', 'Write a blog post', 'Practice guitar',
+                    'Call a friend', 'Plan the week', 'Learn 20 words', 'Fix the bike']
+
+# Rows per INSERT while seeding
+SEED_CHUNK_SIZE = 10000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def seed_database(args, rng):
+    """
+    Create the tables and insert the synthetic users and quests. All but the
+    last `reserved` users also get today's daily quests, the reserved ones are
+    left for the generate_daily_quests route.
+    Returns:
+        List of the benchmark user ids
+    """
+    from werkzeug.security import generate_password_hash
+    from app import (app, db, init_db, generate_daily_quests_range, User, Quest, LEVEL_CURVE,
+                     QUEST_KIND_DAILY, QUEST_KIND_SIDE)
+
+    with app.app_context():
+        init_db()
+        first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+        password_hash = generate_password_hash('benchmark')
+        now = datetime.utcnow()
+        yesterday = date.today() - timedelta(days=1)
+        daily_count = int(args.quests_per_user * args.daily_fraction)
+
+        user_rows = []
+        quest_rows = []
+
+        def flush():
+            if user_rows:
+                db.session.execute(db.insert(User), user_rows)
+            for start in range(0, len(quest_rows), SEED_CHUNK_SIZE):
+                db.session.execute(db.insert(Quest), quest_rows[start:start + SEED_CHUNK_SIZE])
+            db.session.commit()
+            user_rows.clear()
+            quest_rows.clear()
+
+        for user_id in range(first_id, first_id + args.users):
+            points = 0
+            for index in range(args.quests_per_user):
+                daily = index < daily_count
+                created_at = now - timedelta(days=rng.randint(1, args.days), minutes=rng.randint(0, 1439))
+                completed = rng.random() < (0.8 if daily else 0.7)
+                reward = rng.choice([10, 20, 30, 50])
+                if completed:
+                    points += reward
+                quest_rows.append({
+                    'name': f'Daily training {index % 5 + 1}' if daily else rng.choice(SIDE_QUEST_NAMES),
+                    'description': 'Synthetic benchmark quest',
+                    'tags': json.dumps([QUEST_KIND_DAILY] if daily else []),
+                    'duration': 30,
+                    'difficulty': rng.choice(['Easy', 'Medium', 'Hard']),
+                    'reward': reward,
+                    'completed': completed,
+                    'completion_date': created_at + timedelta(minutes=rng.randint(5, 600)) if completed else None,
+                    'created_at': created_at,
+                    'user_id': user_id,
+                    'priority': rng.randint(1, 5),
+                    'kind': QUEST_KIND_DAILY if daily else QUEST_KIND_SIDE,
+                })
+            user_rows.append({
+                'id': user_id,
+                'username': f'bench-{user_id}',
+                'password_hash': password_hash,
+                'points': points,
+                'level': LEVEL_CURVE.level_for(points),
+                'streak': rng.randint(0, 30),
+                'points_this_week': rng.randint(0, 300),
+                'last_daily_quest_date': yesterday,
+                'data_version': 0,
+            })
+            if len(quest_rows) >= SEED_CHUNK_SIZE * 10:
+                flush()
+        flush()
+
+        last_id = first_id + args.users - 1
+        if args.users > args.reserved:
+            generate_daily_quests_range(first_id, last_id - args.reserved, date.today())
+        return list(range(first_id, last_id + 1))
+
+
+def open_side_quest_ids(user_ids, limit, rng):
+    from app import app, db, Quest, QUEST_KIND_SIDE
+
+    with app.app_context():
+        ids = db.session.scalars(db.select(Quest.id).where(
+            Quest.user_id.between(user_ids[0], user_ids[-1]),
+            Quest.completed == False,
+            Quest.kind == QUEST_KIND_SIDE
+        )).all()
+        quests = db.session.execute(db.select(Quest.id, Quest.user_id).where(
+            Quest.id.in_(rng.sample(ids, min(limit, len(ids))))
+        )).all()
+    rng.shuffle(quests)
+    return [(user_id, quest_id) for quest_id, user_id in quests]
+
+
+def session_cookie(user_id):
+    """A session cookie logging in the user, signed like Flask's own"""
+    from app import app
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    return f"{app.config.get('SESSION_COOKIE_NAME', 'session')}={serializer.dumps({'user_id': user_id})}"
+
+
+def build_plan(route, count, user_ids, reserved_ids, open_quests, rng):
+    """(user_id, method, path, form) of the requests of a route"""
+    if route == 'generate_daily_quests':
+        return [(user_id, 'GET', '/quests', None) for user_id in reserved_ids[:count]]
+    if route == 'complete_quest':
+        return [(user_id, 'POST', f'/complete_quest/{quest_id}', None) for user_id, quest_id in open_quests[:count]]
+    users = [rng.choice(user_ids) for _ in range(count)]
+    if route == 'add_quest':
+        return [(user_id, 'POST', '/add_quest', {
+            'name': f'Benchmark quest {index}',
+            'description': 'Added by the benchmark',
+            'tags[]': 'bench, synthetic',
+            'duration': '25',
+            'difficulty': 'Medium',
+            'reward': '20',
+            'priority': '2',
+        }) for index, user_id in enumerate(users)]
+    return [(user_id, 'GET', f'/{route}', None) for user_id in users]
+
+
+class QueryCounter:
+    """Count the SQL statements each thread executes"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self):
+        from sqlalchemy import event
+        from app import app, db
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    def value(self):
+        return getattr(self._local, 'count', 0)
+
+
+def make_client_sender(counter):
+    from app import app
+
+    local = threading.local()
+
+    def send(method, path, form, cookie):
+        # The test client is not thread-safe, use one per thread
+        if not hasattr(local, 'client'):
+            local.client = app.test_client(use_cookies=False)
+        counter.reset()
+        response = local.client.open(path, method=method, data=form, headers={'Cookie': cookie})
+        response.close()
+        return response.status_code, response.headers.get('X-Page-Cache'), counter.value()
+    return send
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def make_http_sender(url):
+    opener = urllib.request.build_opener(NoRedirect)
+
+    def send(method, path, form, cookie):
+        data = urllib.parse.urlencode(form).encode() if form is not None else (b'' if method == 'POST' else None)
+        request = urllib.request.Request(url + path, data=data, method=method, headers={'Cookie': cookie})
+        try:
+            with opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status, response.headers.get('X-Page-Cache'), None
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('X-Page-Cache'), None
+    return send
+
+
+def run_route(send, plan, concurrency):
+    latencies = []
+    queries = []
+    statuses = {}
+    cache_hits = 0
+    lock = threading.Lock()
+
+    def one(item):
+        nonlocal cache_hits
+        user_id, method, path, form = item
+        cookie = session_cookie(user_id)
+        start = time.perf_counter()
+        status, cache_status, query_count = send(method, path, form, cookie)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            cache_hits += cache_status == 'HIT'
+            if query_count is not None:
+                queries.append(query_count)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, plan))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    queries.sort()
+    result = {
+        'requests': len(plan),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(plan) / duration, 1) if duration else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'page_cache_hits': cache_hits,
+    }
+    if queries:
+        result['sql_queries'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'p95': percentile(queries, 0.95),
+            'max': queries[-1],
+        }
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers, threads):
+    port = free_port()
+    env = dict(os.environ)
+    env.pop('DAILY_QUEST_SCHEDULER', None)
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(workers), '--threads', str(threads),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            with urllib.request.urlopen(url + '/login', timeout=5) as response:
+                response.read()
+            return process, url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 60 seconds')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    for mode, routes in results['modes'].items():
+        print(f'{mode}:')
+        for route, stats in routes.items():
+            latency = stats['latency_ms']
+            queries = f", {stats['sql_queries']['mean']:.1f} queries" if 'sql_queries' in stats else ''
+            print(f"  {route:22} p50 {latency['p50']:8.2f} ms  p95 {latency['p95']:8.2f} ms  "
+                  f"p99 {latency['p99']:8.2f} ms  {stats['throughput_rps']:8.1f} req/s{queries}")
+
+
+def print_comparison(results, baseline):
+    print(f"Change against {baseline.get('commit') or 'baseline'}:")
+    for mode, routes in results['modes'].items():
+        for route, stats in routes.items():
+            before = baseline.get('modes', {}).get(mode, {}).get(route)
+            if before is None:
+                continue
+            changes = []
+            for name in ('p50', 'p95'):
+                old, new = before['latency_ms'][name], stats['latency_ms'][name]
+                changes.append(f"{name} {(new - old) / old * 100:+.1f}%" if old else f'{name} n/a')
+            if 'sql_queries' in stats and 'sql_queries' in before:
+                changes.append(f"queries {before['sql_queries']['mean']:.1f} -> {stats['sql_queries']['mean']:.1f}")
+            print(f"  {mode:9} {route:22} {'  '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--quests-per-user', type=int, default=100)
+    parser.add_argument('--days', type=int, default=60, help='days of quest history')
+    parser.add_argument('--daily-fraction', type=float, default=0.6, help='share of the quests that are daily quests')
+    parser.add_argument('--requests', type=int, default=300, help='requests per route and mode')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mode', choices=['client', 'gunicorn', 'both'], default='both')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--routes', default=','.join(ROUTES), help='comma separated routes to run')
+    parser.add_argument('--database', default=os.path.join(tempfile.gettempdir(), 'the-system-bench.db'),
+                        help='SQLite file to create, replaced on every run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='results JSON of an earlier run to compare against')
+    args = parser.parse_args()
+
+    routes = [route for route in args.routes.split(',') if route]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+    modes = ['client', 'gunicorn'] if args.mode == 'both' else [args.mode]
+    # Users left without today's daily quests, each is used once
+    args.reserved = args.requests * len(modes) if 'generate_daily_quests' in routes else 0
+    if args.users <= args.reserved:
+        parser.error(f'--users must be above {args.reserved} (--requests times the number of modes)')
+
+    # Must be set before the app is imported, gunicorn inherits them
+    database = os.path.abspath(args.database)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database
+    os.environ['LLM_BACKEND'] = 'stub'
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    user_ids = seed_database(args, rng)
+    print(f'Seeded {args.users} users with {args.users * args.quests_per_user} quests '
+          f'in {time.perf_counter() - started:.1f} s')
+
+    reserved_ids = user_ids[len(user_ids) - args.reserved:]
+    active_ids = user_ids[:len(user_ids) - args.reserved]
+    open_quests = open_side_quest_ids(active_ids, args.requests * len(modes), rng)
+
+    counter = QueryCounter()
+    counter.install()
+    results = {
+        'commit': git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'modes': {},
+    }
+    for index, mode in enumerate(modes):
+        process = None
+        if mode == 'client':
+            send = make_client_sender(counter)
+        else:
+            process, url = start_gunicorn(args.workers, args.threads)
+            send = make_http_sender(url)
+        try:
+            results['modes'][mode] = {}
+            for route in routes:
+                reserved = reserved_ids[index * args.requests:(index + 1) * args.requests]
+                quests = open_quests[index * args.requests:(index + 1) * args.requests]
+                plan = build_plan(route, args.requests, active_ids, reserved, quests, rng)
+                results['modes'][mode][route] = run_route(send, plan, args.concurrency)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
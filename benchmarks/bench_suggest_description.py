@@ -0,0 +1,140 @@
+"""Load test for /suggest_description.
+
+Drives the endpoint at a target concurrency and reports latency percentiles
+and throughput. By default it runs in-process through the Flask test client
+with the stub LLM backend, so it needs neither network access nor API quota:
+
+    python benchmarks/bench_suggest_description.py --concurrency 16 --requests 2000
+
+Use --url to load a running server instead (start it with LLM_BACKEND=stub to
+keep it offline), and the --stub-* options to shape the stub's latency and
+failures. --titles controls how many distinct titles are requested, which is
+what decides the description cache hit rate.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def make_http_client(url):
+    def post(title):
+        request = urllib.request.Request(
+            url.rstrip('/') + '/suggest_description',
+            data=json.dumps({'questTitle': title}).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return post
+
+
+def make_local_client():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app import app
+
+    local = threading.local()
+
+    def post(title):
+        # The test client is not thread-safe, use one per thread
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client.post('/suggest_description', json={'questTitle': title}).status_code
+    return post
+
+
+def run(post, titles, total_requests, concurrency, seed):
+    rng = random.Random(seed)
+    # Skewed title popularity: a few titles are requested far more than the rest
+    weights = [1 / (rank + 1) for rank in range(len(titles))]
+    plan = rng.choices(titles, weights=weights, k=total_requests)
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(title):
+        start = time.perf_counter()
+        status = post(title)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, plan))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'distinct_titles': len(titles),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(total_requests / duration, 1) if duration else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process test client)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--titles', type=int, default=50, help='Number of distinct quest titles')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stub-latency-ms', type=float, default=300)
+    parser.add_argument('--stub-jitter-ms', type=float, default=150)
+    parser.add_argument('--stub-distribution', default='lognormal', choices=['fixed', 'uniform', 'lognormal'])
+    parser.add_argument('--stub-failure-rate', type=float, default=0.01)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.url:
+        post = make_http_client(args.url)
+    else:
+        # Must be set before the app is imported
+        os.environ.setdefault('LLM_BACKEND', 'stub')
+        os.environ.setdefault('STUB_LLM_LATENCY_MS', str(args.stub_latency_ms))
+        os.environ.setdefault('STUB_LLM_LATENCY_JITTER_MS', str(args.stub_jitter_ms))
+        os.environ.setdefault('STUB_LLM_LATENCY_DISTRIBUTION', args.stub_distribution)
+        os.environ.setdefault('STUB_LLM_FAILURE_RATE', str(args.stub_failure_rate))
+        os.environ.setdefault('STUB_LLM_SEED', str(args.seed))
+        post = make_local_client()
+
+    titles = [f'Benchmark quest {index}' for index in range(args.titles)]
+    results = run(post, titles, args.requests, args.concurrency, args.seed)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class SlotLimiter:
+    """
+    Limit how many operations run at the same time across every worker
+    process on the host.
+
+    Each slot is a lock file; holding an exclusive flock on it means holding
+    the slot. The kernel releases the lock if a worker dies, so a crashed
+    request can never leak a slot. Without fcntl the limit falls back to a
+    per-process semaphore.
+    """
+
+    def __init__(self, directory, slots, poll_interval=0.05):
+        self.directory = directory
+        self.slots = slots
+        self.poll_interval = poll_interval
+        self._semaphore = threading.BoundedSemaphore(slots) if fcntl is None else None
+
+    def _try_acquire(self):
+        if self._semaphore is not None:
+            return self._semaphore if self._semaphore.acquire(blocking=False) else None
+        os.makedirs(self.directory, exist_ok=True)
+        for slot in range(self.slots):
+            fd = os.open(os.path.join(self.directory, f'slot-{slot}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError:
+                os.close(fd)
+        return None
+
+    def acquire(self, timeout=0):
+        """Take a slot, waiting up to timeout seconds. Returns a handle for release() or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            handle = self._try_acquire()
+            if handle is not None or time.monotonic() >= deadline:
+                return handle
+            time.sleep(self.poll_interval)
+
+    def release(self, handle):
+        if self._semaphore is not None:
+            self._semaphore.release()
+        else:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            os.close(handle)
+
+    @contextmanager
+    def slot(self, timeout=0):
+        """Context manager yielding True if a slot was taken, False if none was free in time"""
+        handle = self.acquire(timeout)
+        try:
+            yield handle is not None
+        finally:
+            if handle is not None:
+                self.release(handle)
+
+
+class LeaderLock:
+    """
+    Elect one process on the host, e.g. to run background jobs once instead
+    of in every worker.
+
+    The leader holds an exclusive flock on a lock file for as long as it
+    lives. The kernel releases it when the leader dies, and the next process
+    calling is_leader() takes over. Without fcntl every process leads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def is_leader(self):
+        """Whether this process holds the lock, trying to take it if not"""
+        if fcntl is None:
+            return True
+        with self._lock:
+            if self._fd is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._fd = fd
+                except OSError:
+                    os.close(fd)
+            return self._fd is not None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key in this process: the first
+    caller runs the function, callers arriving while it runs wait and get the
+    same result (or exception) instead of repeating the work.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with the same key, return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import hashlib
+import json
+import re
+import threading
+import time
+
+import sqlalchemy as sa
+
+
+def normalize_title(title):
+    """Normalize a quest title so 'Push-ups', ' push-ups ' and 'PUSH-UPS!' share a cache entry"""
+    title = re.sub(r'\s+', ' ', (title or '').strip().lower())
+    return title.strip(' .!?')
+
+
+def config_hash(*parts):
+    """Short stable hash of the model name, generation config and prompt"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def cache_key(title, model_hash):
+    return hashlib.sha256(f'{model_hash}:{normalize_title(title)}'.encode()).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLDescriptionStore:
+    """
+    Persistent cache tier stored in a database table.
+
+    Uses its own connections from the engine so reading or writing the cache
+    never commits or rolls back the caller's ORM session. The table keeps at
+    most max_entries rows; the least recently used rows are evicted.
+
+    The hits column only counts the reads that refreshed last_used_at, at
+    most one per TOUCH_INTERVAL: it marks recent use, it is not a hit count
+    (those are in DescriptionCache.stats() and /metrics).
+    """
+
+    # Only refresh last_used_at on reads when it is older than this
+    TOUCH_INTERVAL = timedelta(hours=1)
+
+    def __init__(self, get_engine, table, max_entries=10000, evict_every=100):
+        """
+        Args:
+            get_engine: Function returning the SQLAlchemy engine (called lazily)
+            table: Table with key, title, description, created_at, last_used_at and hits columns
+            max_entries: Maximum number of rows kept in the table
+            evict_every: Run eviction once every this many inserts
+        """
+        self.get_engine = get_engine
+        self.table = table
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._inserts = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        table = self.table
+        with self.get_engine().begin() as connection:
+            row = connection.execute(
+                sa.select(table.c.description, table.c.last_used_at).where(table.c.key == key)
+            ).first()
+            if row is None:
+                return None
+            now = datetime.utcnow()
+            if row.last_used_at is None or now - row.last_used_at > self.TOUCH_INTERVAL:
+                connection.execute(
+                    table.update().where(table.c.key == key).values(last_used_at=now, hits=table.c.hits + 1)
+                )
+            return row.description
+
+    def set(self, key, title, description):
+        table = self.table
+        now = datetime.utcnow()
+        with self.get_engine().begin() as connection:
+            updated = connection.execute(
+                table.update().where(table.c.key == key).values(description=description, last_used_at=now)
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(
+                    key=key, title=title, description=description,
+                    created_at=now, last_used_at=now, hits=0
+                ))
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % self.evict_every == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Delete the least recently used rows beyond max_entries"""
+        table = self.table
+        stale_keys = sa.select(table.c.key).order_by(table.c.last_used_at.desc()).offset(self.max_entries)
+        with self.get_engine().begin() as connection:
+            return connection.execute(table.delete().where(table.c.key.in_(stale_keys))).rowcount
+
+
+class DescriptionCache:
+    """Two-tier cache: in-process TTLCache in front of a persistent store"""
+
+    def __init__(self, memory, store=None, listener=None):
+        """
+        Args:
+            memory: TTLCache
+            store: SQLDescriptionStore or None for no persistent tier
+            listener: Function called with (result, tier) for every lookup or
+                error of a tier, result 'hits', 'misses' or 'errors' and tier
+                'memory' or 'store', e.g. from Metrics.cache_listener
+        """
+        self.memory = memory
+        self.store = store
+        self.listener = listener
+        self.counters = {'memory_hits': 0, 'store_hits': 0, 'misses': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _observe(self, result, tier):
+        if self.listener is not None:
+            self.listener(result, tier)
+
+    def get(self, key):
+        description = self.memory.get(key)
+        if description is not None:
+            self._count('memory_hits')
+            self._observe('hits', 'memory')
+            return description
+        self._observe('misses', 'memory')
+        if self.store is not None:
+            try:
+                description = self.store.get(key)
+            except sa.exc.SQLAlchemyError:
+                # The cache must never break description generation
+                self._count('errors')
+                self._observe('errors', 'store')
+                description = None
+            if description is not None:
+                self.memory.set(key, description)
+                self._count('store_hits')
+                self._observe('hits', 'store')
+                return description
+            self._observe('misses', 'store')
+        self._count('misses')
+        return None
+
+    def set(self, key, title, description):
+        self.memory.set(key, description)
+        if self.store is not None:
+            try:
+                self.store.set(key, title, description)
+            except sa.exc.SQLAlchemyError:
+                self._count('errors')
+                self._observe('errors', 'store')
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['memory_hits'] + counters['store_hits'] + counters['misses']
+        counters['hit_rate'] = (counters['memory_hits'] + counters['store_hits']) / lookups if lookups else 0.0
+        counters['memory_entries'] = len(self.memory)
+        return counters
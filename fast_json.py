@@ -0,0 +1,41 @@
+from flask.json.provider import DefaultJSONProvider
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson when it is installed, and with
+    the standard json module otherwise. Datetimes and the other types orjson
+    would format differently go through Flask's default, so the output only
+    differs in whitespace and in non-ASCII characters not being escaped.
+    orjson is only used for compact output (not in debug mode).
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        try:
+            import orjson
+        except ImportError:
+            self._orjson_options = None
+        else:
+            self._orjson = orjson
+            self._orjson_options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            if self.sort_keys:
+                self._orjson_options |= orjson.OPT_SORT_KEYS
+            self._orjson_options |= orjson.OPT_NON_STR_KEYS
+
+    def _use_orjson(self):
+        return self._orjson_options is not None and (self.compact or (self.compact is None and not self._app.debug))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or not self._use_orjson():
+            return super().dumps(obj, **kwargs)
+        return self._orjson.dumps(obj, default=self.default, option=self._orjson_options).decode()
+
+    def response(self, *args, **kwargs):
+        if not self._use_orjson():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self._orjson.dumps(obj, default=self.default, option=self._orjson_options),
+            mimetype=self.mimetype
+        )
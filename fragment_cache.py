@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+
+
+class MemoryFragmentStore:
+    """In-process LRU of the latest rendered fragment of each (user, name)"""
+
+    name = 'memory'
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, name):
+        """Return (version, body) or None"""
+        with self._lock:
+            entry = self._entries.get((user_id, name))
+            if entry is not None:
+                self._entries.move_to_end((user_id, name))
+            return entry
+
+    def set(self, user_id, name, version, body):
+        with self._lock:
+            self._entries[(user_id, name)] = (version, body)
+            self._entries.move_to_end((user_id, name))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileFragmentStore:
+    """
+    Fragments stored as files shared by every worker on the host, one file
+    per (user, name) holding the version on its first line. Writes go through
+    a temporary file and a rename, so readers never see a partial fragment.
+    """
+
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, user_id, name):
+        return os.path.join(self.directory, str(user_id), name)
+
+    def get(self, user_id, name):
+        try:
+            with open(self._path(user_id, name), encoding='utf-8') as f:
+                version = f.readline().rstrip('\n')
+                return version, f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, user_id, name, version, body):
+        path = self._path(user_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(f'{version}\n')
+                f.write(body)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self):
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                os.unlink(os.path.join(root, file))
+
+    def __len__(self):
+        return sum(len(files) for _, _, files in os.walk(self.directory))
+
+
+class FragmentCache:
+    """
+    Rendered fragments keyed by user and name, valid while the user's version
+    is unchanged. Only the latest version of a fragment is kept, a lookup
+    with any other version is a miss.
+    """
+
+    def __init__(self, store=None, listener=None):
+        """
+        Args:
+            store: MemoryFragmentStore, FileFragmentStore or None to disable caching
+            listener: Function called with (counter, tier) whenever a counter
+                is incremented, tier the name of the store, e.g. from
+                Metrics.cache_listener
+        """
+        self.store = store
+        self.listener = listener
+        self.counters = {'hits': 0, 'misses': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+        if self.listener is not None:
+            self.listener(counter, self.store.name)
+
+    def get(self, user_id, name, version):
+        if self.store is None:
+            return None
+        try:
+            entry = self.store.get(user_id, name)
+        except OSError:
+            # The cache must never break a page
+            self._count('errors')
+            entry = None
+        if entry is not None and entry[0] == str(version):
+            self._count('hits')
+            return entry[1]
+        self._count('misses')
+        return None
+
+    def set(self, user_id, name, version, body):
+        if self.store is None:
+            return
+        try:
+            self.store.set(user_id, name, str(version), body)
+        except OSError:
+            self._count('errors')
+
+    def get_or_render(self, user_id, name, version, render):
+        """Return the cached fragment for this version or render() and cache it"""
+        body = self.get(user_id, name, version)
+        if body is None:
+            body = render()
+            self.set(user_id, name, version, body)
+        return body
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+        counters['entries'] = len(self.store) if self.store is not None else 0
+        return counters
+
+
+def create_fragment_cache(config, listener=None):
+    """
+    Build the cache selected by PAGE_CACHE_BACKEND ('memory', 'file' or
+    'none'), its lookups reported to listener (see FragmentCache)
+    """
+    backend = config.get('PAGE_CACHE_BACKEND', 'memory')
+    if backend == 'memory':
+        return FragmentCache(MemoryFragmentStore(int(config.get('PAGE_CACHE_SIZE', 1024))), listener)
+    if backend == 'file':
+        return FragmentCache(FileFragmentStore(config['PAGE_CACHE_DIR']), listener)
+    if backend == 'none':
+        return FragmentCache(None)
+    raise ValueError(f'Unknown page cache backend: {backend}')
@@ -0,0 +1,44 @@
+# Gunicorn settings, picked up automatically by `gunicorn app:app`.
+#
+# The app is imported once in the master (preload_app) and the workers are
+# forked from it, so they start warm and share the imported code copy-on-write.
+# Importing the app does no database work: run `flask db upgrade && flask init-db`
+# once per release instead.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threads keep the streams (SSE) from tying up a whole worker. Every open
+# dashboard or quests page holds one thread on /progress/stream, idle, for up
+# to PROGRESS_STREAM_MAX_AGE seconds, and requests queue once all threads of
+# a worker are taken: size GUNICORN_THREADS for the open pages per worker.
+# Streams don't hold a database connection, so this can exceed DB_POOL_SIZE.
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+preload_app = True
+
+
+def on_starting(server):
+    # Samples left by the workers of a previous run would be added to this one's
+    multiprocess_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiprocess_dir and os.path.isdir(multiprocess_dir):
+        for name in os.listdir(multiprocess_dir):
+            if name.endswith('.db'):
+                os.unlink(os.path.join(multiprocess_dir, name))
+
+
+def post_fork(server, worker):
+    from app import app, db, init_app
+
+    # Never share the parent's pooled connections with a child
+    with app.app_context():
+        db.engine.dispose(close=False)
+    init_app(app)
+
+
+def child_exit(server, worker):
+    # Drop the gauges of a dead worker, its counters and histograms are kept
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,94 @@
+from bisect import bisect_right
+import threading
+
+
+class LevelCurve:
+    """
+    Points required for each level, precomputed into a sorted list.
+
+    thresholds[i] is the total number of points needed to reach level i + 1,
+    so the level for a number of points is a bisect over the list. When a
+    next_threshold function is given the curve has no max level: the list is
+    extended on demand whenever a lookup goes past its end.
+    """
+
+    def __init__(self, thresholds, next_threshold=None):
+        """
+        Args:
+            thresholds: Points needed for levels 1, 2, 3, ... (must start at 0 and be increasing)
+            next_threshold: Optional function (thresholds) -> points needed for the next level,
+                used to extend the curve past the end of the table
+        """
+        self.thresholds = list(thresholds)
+        self.next_threshold = next_threshold
+        self._lock = threading.Lock()
+        if not self.thresholds or self.thresholds[0] != 0:
+            raise ValueError('Level curve must start at 0 points')
+        if any(b <= a for a, b in zip(self.thresholds, self.thresholds[1:])):
+            raise ValueError('Level thresholds must be strictly increasing')
+
+    @property
+    def max_level(self):
+        """Highest reachable level, None when the curve is unbounded"""
+        return None if self.next_threshold else len(self.thresholds)
+
+    def _extend_to_level(self, level):
+        if not self.next_threshold or len(self.thresholds) >= level:
+            return
+        with self._lock:
+            while len(self.thresholds) < level:
+                self.thresholds.append(self.next_threshold(self.thresholds))
+
+    def _extend_to_points(self, points):
+        if not self.next_threshold or self.thresholds[-1] > points:
+            return
+        with self._lock:
+            while self.thresholds[-1] <= points:
+                self.thresholds.append(self.next_threshold(self.thresholds))
+
+    def level_for(self, points):
+        """Level reached with the given number of points"""
+        points = max(0, points or 0)
+        self._extend_to_points(points)
+        return bisect_right(self.thresholds, points)
+
+    def threshold(self, level):
+        """Points needed to reach a level, None if the level does not exist"""
+        if level < 1:
+            return None
+        self._extend_to_level(level)
+        if level > len(self.thresholds):
+            return None
+        return self.thresholds[level - 1]
+
+    def thresholds_up_to(self, points):
+        """Sorted thresholds covering every level reachable with the given points"""
+        self._extend_to_points(points)
+        return self.thresholds
+
+
+def geometric_growth(growth_rate):
+    """Extend a curve by making each level cost growth_rate times the previous one"""
+    def next_threshold(thresholds):
+        last_step = thresholds[-1] - thresholds[-2] if len(thresholds) > 1 else 1
+        return thresholds[-1] + max(1, int(last_step * growth_rate))
+    return next_threshold
+
+
+def table_curve(level_thresholds, growth_rate=None):
+    """
+    Build a curve from a {level: points} table
+    Args:
+        level_thresholds: Points needed for each level, levels must be 1..n
+        growth_rate: If given, levels past the table keep growing geometrically
+    """
+    thresholds = [points for _, points in sorted(level_thresholds.items())]
+    return LevelCurve(thresholds, geometric_growth(growth_rate) if growth_rate else None)
+
+
+def exponential_curve(base_points=150, growth_rate=1.15):
+    """
+    Build an unbounded curve where level 2 costs base_points and every following
+    level costs growth_rate times the previous one (see others/test.py)
+    """
+    return LevelCurve([0, base_points], geometric_growth(growth_rate))
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import random
+import threading
+import time
+
+
+class LLMError(Exception):
+    """Raised by backends when a generation fails"""
+
+
+class LLMBackend:
+    """
+    Interface of the text generation backends used for quest descriptions.
+
+    generation_config uses the Gemini keys (temperature, max_output_tokens,
+    response_mime_type, ...); backends ignore the keys they don't support.
+    """
+
+    name = 'base'
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        """Return the full generated text for a prompt"""
+        raise NotImplementedError
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        """Yield the generated text in chunks as they are produced"""
+        yield self.generate(prompt, generation_config, timeout)
+
+
+class GeminiBackend(LLMBackend):
+    """Google Generative AI backend, the SDK is imported on first use"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name, generation_config):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        # One model client per worker, created lazily
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(
+                        model_name=self.model_name,
+                        generation_config=self.generation_config,
+                    )
+        return self._model
+
+    def _request_options(self, timeout):
+        return {'timeout': timeout} if timeout else None
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        response = self._get_model().generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options=self._request_options(timeout)
+        )
+        if not response.text:
+            raise LLMError('Empty response')
+        return response.text
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        response = self._get_model().generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=True,
+            request_options=self._request_options(timeout)
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic local backend for development and load tests.
+
+    The text only depends on the prompt. Latency is drawn from a fixed,
+    uniform or lognormal distribution and a fraction of calls fail, both from
+    a seeded random generator so runs can be reproduced. When JSON output is
+    requested, every '- title' line of the prompt is mapped to a description,
+    matching the batched description prompt.
+    """
+
+    name = 'stub'
+
+    WORDS = ['train', 'focus', 'push', 'steady', 'reward', 'level', 'quest', 'discipline',
+             'strength', 'mind', 'daily', 'hunter', 'system', 'progress', 'limit', 'power']
+
+    def __init__(self, latency_ms=50, latency_jitter_ms=0, latency_distribution='fixed',
+                 failure_rate=0.0, seed=0, chunk_words=4):
+        """
+        Args:
+            latency_ms: Mean latency of a generation
+            latency_jitter_ms: Spread of the latency (half-width for uniform, sigma scale for lognormal)
+            latency_distribution: 'fixed', 'uniform' or 'lognormal'
+            failure_rate: Fraction of calls raising LLMError (0.0 - 1.0)
+            seed: Seed of the latency and failure random generator
+            chunk_words: Words per chunk when streaming
+        """
+        if latency_distribution not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f'Unknown latency distribution: {latency_distribution}')
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.failure_rate = failure_rate
+        self.chunk_words = chunk_words
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        """Draw (latency in seconds, failed) for one call"""
+        with self._lock:
+            if self.latency_distribution == 'uniform':
+                latency = self._random.uniform(self.latency_ms - self.latency_jitter_ms,
+                                               self.latency_ms + self.latency_jitter_ms)
+            elif self.latency_distribution == 'lognormal' and self.latency_ms > 0:
+                sigma = self.latency_jitter_ms / self.latency_ms
+                latency = self.latency_ms * self._random.lognormvariate(-sigma ** 2 / 2, sigma)
+            else:
+                latency = self.latency_ms
+            failed = self._random.random() < self.failure_rate
+        return max(0.0, latency) / 1000, failed
+
+    def _text(self, seed_text, sentences=3):
+        digest = hashlib.sha256(seed_text.encode()).digest()
+        words = [self.WORDS[byte % len(self.WORDS)] for byte in digest[:sentences * 6]]
+        return ' '.join(
+            ' '.join(words[i:i + 6]).capitalize() + '.'
+            for i in range(0, len(words), 6)
+        )
+
+    def _response(self, prompt, generation_config):
+        if (generation_config or {}).get('response_mime_type') == 'application/json':
+            titles = [line[2:] for line in prompt.splitlines() if line.startswith('- ')]
+            return json.dumps({title: self._text(title) for title in titles})
+        return self._text(prompt)
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        latency, failed = self._draw()
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise LLMError('Stub generation timed out')
+        time.sleep(latency)
+        if failed:
+            raise LLMError('Stub generation failed')
+        return self._response(prompt, generation_config)
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        latency, failed = self._draw()
+        words = self._response(prompt, generation_config).split(' ')
+        chunks = [' '.join(words[i:i + self.chunk_words]) + ' ' for i in range(0, len(words), self.chunk_words)]
+        for index, chunk in enumerate(chunks):
+            time.sleep(latency / len(chunks))
+            if failed and index == len(chunks) // 2:
+                raise LLMError('Stub generation failed')
+            yield chunk
+
+
+def create_backend(config):
+    """Build the backend selected by LLM_BACKEND ('gemini' or 'stub')"""
+    backend = config.get('LLM_BACKEND', 'gemini')
+    if backend == 'stub':
+        return StubBackend(
+            latency_ms=float(config.get('STUB_LLM_LATENCY_MS', 50)),
+            latency_jitter_ms=float(config.get('STUB_LLM_LATENCY_JITTER_MS', 0)),
+            latency_distribution=config.get('STUB_LLM_LATENCY_DISTRIBUTION', 'fixed'),
+            failure_rate=float(config.get('STUB_LLM_FAILURE_RATE', 0)),
+            seed=int(config.get('STUB_LLM_SEED', 0)),
+        )
+    if backend == 'gemini':
+        return GeminiBackend(
+            config.get('GEMINI_API_KEY'),
+            config['DESCRIPTION_MODEL_NAME'],
+            config['DESCRIPTION_GENERATION_CONFIG'],
+        )
+    raise ValueError(f'Unknown LLM backend: {backend}')
@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+
+from llm import LLMBackend
+
+# Statements a request may run before a warning is logged, see QUERY_BUDGETS
+DEFAULT_QUERY_BUDGET = 25
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 20, 30, 50, 100)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+
+def parse_query_budgets(value):
+    """'dashboard=8,quests=6' -> {'dashboard': 8, 'quests': 6}"""
+    budgets = {}
+    for item in (value or '').split(','):
+        if item.strip():
+            endpoint, budget = item.split('=', 1)
+            budgets[endpoint.strip()] = int(budget)
+    return budgets
+
+
+class InstrumentedBackend(LLMBackend):
+    """LLM backend recording the latency and errors of every call of another one"""
+
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+        self.name = backend.name
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        start = time.perf_counter()
+        try:
+            return self.backend.generate(prompt, generation_config, timeout)
+        except Exception as e:
+            self.metrics.llm_errors.labels(self.name, 'generate', type(e).__name__).inc()
+            raise
+        finally:
+            self.metrics.llm_latency.labels(self.name, 'generate').observe(time.perf_counter() - start)
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        # Timed until the last chunk, an abandoned stream is not recorded
+        start = time.perf_counter()
+        try:
+            yield from self.backend.stream(prompt, generation_config, timeout)
+        except Exception as e:
+            self.metrics.llm_errors.labels(self.name, 'stream', type(e).__name__).inc()
+            self.metrics.llm_latency.labels(self.name, 'stream').observe(time.perf_counter() - start)
+            raise
+        self.metrics.llm_latency.labels(self.name, 'stream').observe(time.perf_counter() - start)
+
+
+class Metrics:
+    """
+    Prometheus metrics of the app: request latency and status per endpoint,
+    SQL statements and time per request, page cache results, description and
+    fragment cache lookups per tier and LLM calls.
+
+    With a multiprocess_dir every gunicorn worker writes its samples to files
+    in that directory and a scrape of any worker aggregates all of them. The
+    directory must be emptied before the server starts (gunicorn.conf.py does).
+    prometheus_client is imported when the metrics are created.
+    """
+
+    def __init__(self, multiprocess_dir=None, query_budget=DEFAULT_QUERY_BUDGET, query_budgets=None,
+                 token=None, logger=None):
+        if multiprocess_dir:
+            # Read by prometheus_client when it is imported
+            os.makedirs(multiprocess_dir, exist_ok=True)
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = multiprocess_dir
+        import prometheus_client
+
+        self._prometheus = prometheus_client
+        self.multiprocess_dir = multiprocess_dir
+        self.query_budget = query_budget
+        self.query_budgets = query_budgets or {}
+        self.token = token
+        self.logger = logger
+        self._local = threading.local()
+
+        self.registry = prometheus_client.CollectorRegistry(auto_describe=True)
+        self.request_latency = prometheus_client.Histogram(
+            'http_request_duration_seconds', 'Time to build the response',
+            ['endpoint', 'method'], registry=self.registry)
+        self.requests = prometheus_client.Counter(
+            'http_requests_total', 'Requests handled',
+            ['endpoint', 'method', 'status'], registry=self.registry)
+        self.request_statements = prometheus_client.Histogram(
+            'http_request_db_statements', 'SQL statements run by a request',
+            ['endpoint'], buckets=STATEMENT_BUCKETS, registry=self.registry)
+        self.statements = prometheus_client.Counter(
+            'db_statements_total', 'SQL statements run by requests',
+            ['endpoint'], registry=self.registry)
+        self.statement_time = prometheus_client.Counter(
+            'db_statement_seconds_total', 'Time spent in SQL statements run by requests',
+            ['endpoint'], registry=self.registry)
+        self.budget_exceeded = prometheus_client.Counter(
+            'db_query_budget_exceeded_total', 'Requests that ran more SQL statements than their budget',
+            ['endpoint'], registry=self.registry)
+        self.page_cache = prometheus_client.Counter(
+            'page_cache_requests_total', 'Cached page lookups by result',
+            ['endpoint', 'result'], registry=self.registry)
+        self.llm_latency = prometheus_client.Histogram(
+            'llm_request_duration_seconds', 'Duration of LLM calls',
+            ['backend', 'operation'], buckets=LLM_BUCKETS, registry=self.registry)
+        self.llm_errors = prometheus_client.Counter(
+            'llm_errors_total', 'Failed LLM calls',
+            ['backend', 'operation', 'error'], registry=self.registry)
+        # Cache name -> {'hits'|'misses'|'errors': counter labelled by tier}
+        self.cache_lookups = {
+            cache: {
+                result: prometheus_client.Counter(
+                    f'{cache}_{result}_total', f'{description} {result} by tier',
+                    ['tier'], registry=self.registry)
+                for result in ('hits', 'misses', 'errors')
+            }
+            for cache, description in (('description_cache', 'Quest description cache'),
+                                       ('fragment_cache', 'Rendered fragment cache'))
+        }
+
+    def init_app(self, app, engines):
+        """Install the request hooks, the SQL statement listeners and the /metrics endpoint"""
+        from flask import g, request
+        from sqlalchemy import event
+
+        @app.before_request
+        def start_request_metrics():
+            g.metrics_start = time.perf_counter()
+            self._local.statements = 0
+            self._local.statement_time = 0.0
+
+        @app.after_request
+        def record_request_metrics(response):
+            self.observe_request(request.endpoint, request.method, response.status_code, response)
+            g.metrics_recorded = True
+            return response
+
+        @app.teardown_request
+        def record_failed_request_metrics(exc):
+            # after_request is skipped when the view raised
+            if 'metrics_start' in g and not g.get('metrics_recorded'):
+                self.observe_request(request.endpoint, request.method, 500)
+            self._local.statements = None
+
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context rather than the pooled connection, a
+        # statement that raises never reaches after_cursor_execute
+        if context is not None:
+            context.metrics_statement_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, 'metrics_statement_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        # Only statements run while handling a request are counted
+        if getattr(self._local, 'statements', None) is not None:
+            self._local.statements += 1
+            self._local.statement_time += elapsed
+
+    def observe_request(self, endpoint, method, status, response=None):
+        from flask import g
+
+        endpoint = endpoint or 'unmatched'
+        self.request_latency.labels(endpoint, method).observe(time.perf_counter() - g.metrics_start)
+        self.requests.labels(endpoint, method, str(status)).inc()
+
+        statements = getattr(self._local, 'statements', None) or 0
+        self.request_statements.labels(endpoint).observe(statements)
+        if statements:
+            self.statements.labels(endpoint).inc(statements)
+            self.statement_time.labels(endpoint).inc(self._local.statement_time)
+        budget = self.query_budgets.get(endpoint, self.query_budget)
+        if statements > budget:
+            self.budget_exceeded.labels(endpoint).inc()
+            if self.logger is not None:
+                self.logger.warning('%s %s ran %d SQL statements, over its budget of %d',
+                                    method, endpoint, statements, budget)
+
+        if response is not None and response.headers.get('X-Page-Cache'):
+            self.page_cache.labels(endpoint, response.headers['X-Page-Cache'].lower()).inc()
+
+    def instrument_backend(self, backend):
+        return InstrumentedBackend(backend, self)
+
+    def cache_listener(self, cache):
+        """Listener of a DescriptionCache ('description_cache') or FragmentCache ('fragment_cache')"""
+        counters = self.cache_lookups[cache]
+        return lambda result, tier: counters[result].labels(tier).inc()
+
+    def render(self):
+        """(body, content type) of the metrics in the Prometheus text format"""
+        if self.multiprocess_dir:
+            from prometheus_client import multiprocess
+
+            registry = self._prometheus.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = self.registry
+        return self._prometheus.generate_latest(registry), self._prometheus.CONTENT_TYPE_LATEST
+
+    def view(self):
+        from flask import Response, request
+
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            return Response('Forbidden\n', status=403, content_type='text/plain')
+        body, content_type = self.render()
+        return Response(body, content_type=content_type)
+
+
+class NullMetrics:
+    """Used when METRICS_ENABLED is off: no hooks, no /metrics endpoint"""
+
+    def init_app(self, app, engines):
+        pass
+
+    def instrument_backend(self, backend):
+        return backend
+
+    def cache_listener(self, cache):
+        return None
+
+
+def create_metrics(config, logger=None):
+    """
+    Build the metrics from METRICS_ENABLED, PROMETHEUS_MULTIPROC_DIR,
+    QUERY_BUDGET, QUERY_BUDGETS and METRICS_TOKEN (a bearer token /metrics
+    then requires)
+    """
+    if str(config.get('METRICS_ENABLED', '1')).lower() in ('0', 'false', 'no'):
+        return NullMetrics()
+    return Metrics(
+        multiprocess_dir=config.get('PROMETHEUS_MULTIPROC_DIR'),
+        query_budget=int(config.get('QUERY_BUDGET', DEFAULT_QUERY_BUDGET)),
+        query_budgets=parse_query_budgets(config.get('QUERY_BUDGETS')),
+        token=config.get('METRICS_TOKEN'),
+        logger=logger,
+    )
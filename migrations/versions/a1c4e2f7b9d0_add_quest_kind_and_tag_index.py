@@ -0,0 +1,71 @@
+"""Add quest kind and normalized tag table
+
+Revision ID: a1c4e2f7b9d0
+Revises: db9d3cfd68af
+Create Date: 2026-10-18 09:12:41.503117
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e2f7b9d0'
+down_revision = 'db9d3cfd68af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # The table may already exist, from `flask init-db` or an older deployment
+    # that ran db.create_all() on import
+    if not sa.inspect(bind).has_table('quest_tag'):
+        op.create_table('quest_tag',
+        sa.Column('quest_id', sa.Integer(), nullable=False),
+        sa.Column('tag', sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(['quest_id'], ['quest.id'], ),
+        sa.PrimaryKeyConstraint('quest_id', 'tag')
+        )
+        op.create_index('ix_quest_tag_tag_quest_id', 'quest_tag', ['tag', 'quest_id'], unique=False)
+
+    with op.batch_alter_table('quest', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=20), nullable=False, server_default='side'))
+        batch_op.create_index('ix_quest_user_completed_kind', ['user_id', 'completed', 'kind'], unique=False)
+        batch_op.create_index('ix_quest_user_created_at', ['user_id', 'created_at'], unique=False)
+
+    # Backfill kind and tag rows from the JSON tags column
+    quest_tag = sa.table('quest_tag', sa.column('quest_id', sa.Integer), sa.column('tag', sa.String))
+    daily_ids = []
+    tag_rows = []
+    for quest_id, tags in bind.execute(sa.text('SELECT id, tags FROM quest')):
+        try:
+            tags_list = json.loads(tags or '[]')
+        except (json.JSONDecodeError, TypeError):
+            tags_list = []
+        if not isinstance(tags_list, list):
+            continue
+        if 'daily' in tags_list:
+            daily_ids.append(quest_id)
+        for tag in dict.fromkeys(str(t) for t in tags_list):
+            tag_rows.append({'quest_id': quest_id, 'tag': tag})
+
+    if daily_ids:
+        bind.execute(
+            sa.text("UPDATE quest SET kind = 'daily' WHERE id IN :ids").bindparams(sa.bindparam('ids', expanding=True)),
+            {'ids': daily_ids}
+        )
+    if tag_rows:
+        op.bulk_insert(quest_tag, tag_rows)
+
+
+def downgrade():
+    with op.batch_alter_table('quest', schema=None) as batch_op:
+        batch_op.drop_index('ix_quest_user_created_at')
+        batch_op.drop_index('ix_quest_user_completed_kind')
+        batch_op.drop_column('kind')
+
+    op.drop_index('ix_quest_tag_tag_quest_id', table_name='quest_tag')
+    op.drop_table('quest_tag')
@@ -0,0 +1,31 @@
+"""Add user data_version
+
+Revision ID: a4c9e2b7d1f5
+Revises: f3b8d1e6a2c7
+Create Date: 2026-10-18 16:03:27.184402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e2b7d1f5'
+down_revision = 'f3b8d1e6a2c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The column may already exist, from `flask init-db` or an older
+    # deployment that ran db.create_all() on import
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')]
+    if 'data_version' in columns:
+        return
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
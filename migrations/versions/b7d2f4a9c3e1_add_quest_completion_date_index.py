@@ -0,0 +1,26 @@
+"""Add quest completion date index
+
+Revision ID: b7d2f4a9c3e1
+Revises: a1c4e2f7b9d0
+Create Date: 2026-10-18 10:03:12.284519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a9c3e1'
+down_revision = 'a1c4e2f7b9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quest', schema=None) as batch_op:
+        batch_op.create_index('ix_quest_user_completed_completion_date', ['user_id', 'completed', 'completion_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('quest', schema=None) as batch_op:
+        batch_op.drop_index('ix_quest_user_completed_completion_date')
@@ -0,0 +1,51 @@
+"""Add archived_quest
+
+Revision ID: b8e1f4c2a6d9
+Revises: a4c9e2b7d1f5
+Create Date: 2026-10-18 16:48:05.512093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1f4c2a6d9'
+down_revision = 'a4c9e2b7d1f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # With ARCHIVE_DATABASE_URL set, `flask init-db` creates the table in the
+    # archive database and this one stays empty
+    if sa.inspect(op.get_bind()).has_table('archived_quest'):
+        return
+    op.create_table('archived_quest',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('target', sa.Integer(), nullable=True),
+    sa.Column('unit', sa.String(length=20), nullable=True),
+    sa.Column('tags', sa.Text(), nullable=True),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('difficulty', sa.String(length=20), nullable=False),
+    sa.Column('reward', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=True),
+    sa.Column('completion_date', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('due_date', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archived_quest_user_completed_completion_date', 'archived_quest', ['user_id', 'completed', 'completion_date'], unique=False)
+    op.create_index('ix_archived_quest_user_id', 'archived_quest', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_archived_quest_user_id', table_name='archived_quest')
+    op.drop_index('ix_archived_quest_user_completed_completion_date', table_name='archived_quest')
+    op.drop_table('archived_quest')
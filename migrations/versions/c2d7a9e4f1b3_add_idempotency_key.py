@@ -0,0 +1,38 @@
+"""Add idempotency_key
+
+Revision ID: c2d7a9e4f1b3
+Revises: b8e1f4c2a6d9
+Create Date: 2026-10-18 19:52:41.306218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d7a9e4f1b3'
+down_revision = 'b8e1f4c2a6d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # `flask init-db` runs db.create_all(), so the table may already exist
+    if sa.inspect(op.get_bind()).has_table('idempotency_key'):
+        return
+    op.create_table('idempotency_key',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    op.create_index(op.f('ix_idempotency_key_created_at'), 'idempotency_key', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_idempotency_key_created_at'), table_name='idempotency_key')
+    op.drop_table('idempotency_key')
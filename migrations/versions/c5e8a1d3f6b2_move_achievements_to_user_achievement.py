@@ -0,0 +1,76 @@
+"""Move achievements to user_achievement table
+
+Revision ID: c5e8a1d3f6b2
+Revises: b7d2f4a9c3e1
+Create Date: 2026-10-18 11:26:05.917342
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a1d3f6b2'
+down_revision = 'b7d2f4a9c3e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # The table may already exist, from `flask init-db` or an older deployment
+    # that ran db.create_all() on import
+    if not sa.inspect(bind).has_table('user_achievement'):
+        op.create_table('user_achievement',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('achievement_id', sa.String(length=50), nullable=False),
+        sa.Column('unlocked_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'achievement_id')
+        )
+        op.create_index('ix_user_achievement_achievement_id', 'user_achievement', ['achievement_id'], unique=False)
+
+    # Backfill from the ';'-joined achievements string, keeping the unlock order
+    user_achievement = sa.table('user_achievement',
+        sa.column('user_id', sa.Integer),
+        sa.column('achievement_id', sa.String),
+        sa.column('unlocked_at', sa.DateTime)
+    )
+    # A table construct, so "user" (reserved in PostgreSQL) is quoted
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('achievements', sa.Text))
+    now = datetime.utcnow()
+    rows = []
+    for user_id, achievements in bind.execute(sa.select(user.c.id, user.c.achievements)):
+        achievement_ids = [ach.strip() for ach in (achievements or '').split(';') if ach.strip()]
+        for position, achievement_id in enumerate(dict.fromkeys(achievement_ids)):
+            rows.append({
+                'user_id': user_id,
+                'achievement_id': achievement_id,
+                'unlocked_at': now.replace(microsecond=position)
+            })
+    if rows:
+        op.bulk_insert(user_achievement, rows)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('achievements')
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('achievements', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    achievements = {}
+    for user_id, achievement_id in bind.execute(sa.text(
+            'SELECT user_id, achievement_id FROM user_achievement ORDER BY user_id, unlocked_at')):
+        achievements.setdefault(user_id, []).append(achievement_id)
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('achievements', sa.Text))
+    for user_id, achievement_ids in achievements.items():
+        bind.execute(
+            user.update().where(user.c.id == user_id).values(achievements=';'.join(achievement_ids))
+        )
+
+    op.drop_index('ix_user_achievement_achievement_id', table_name='user_achievement')
+    op.drop_table('user_achievement')
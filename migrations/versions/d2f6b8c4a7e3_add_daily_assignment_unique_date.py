@@ -0,0 +1,31 @@
+"""Add unique daily assignment per user and date
+
+Revision ID: d2f6b8c4a7e3
+Revises: c5e8a1d3f6b2
+Create Date: 2026-10-18 12:41:37.652208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b8c4a7e3'
+down_revision = 'c5e8a1d3f6b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the first assignment of any duplicated user/date pair
+    op.execute(
+        'DELETE FROM daily_quest_assignment WHERE id NOT IN ('
+        'SELECT MIN(id) FROM daily_quest_assignment GROUP BY user_id, assigned_date)'
+    )
+    with op.batch_alter_table('daily_quest_assignment', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_daily_quest_assignment_user_date', ['user_id', 'assigned_date'])
+
+
+def downgrade():
+    with op.batch_alter_table('daily_quest_assignment', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_daily_quest_assignment_user_date', type_='unique')
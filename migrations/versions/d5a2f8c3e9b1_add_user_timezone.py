@@ -0,0 +1,47 @@
+"""Add user timezone and last_completed_day
+
+Revision ID: d5a2f8c3e9b1
+Revises: c2d7a9e4f1b3
+Create Date: 2026-10-18 21:14:09.528713
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a2f8c3e9b1'
+down_revision = 'c2d7a9e4f1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # `flask init-db` runs db.create_all(), so the columns may already exist
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')]
+    if 'timezone' not in columns:
+        with op.batch_alter_table('user', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+            batch_op.add_column(sa.Column('utc_offset', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('last_completed_day', sa.Date(), nullable=True))
+            batch_op.create_index('ix_user_utc_offset_last_completed_day', ['utc_offset', 'last_completed_day'], unique=False)
+            batch_op.create_index('ix_user_timezone_utc_offset', ['timezone', 'utc_offset'], unique=False)
+
+    # Users without a completion day are on UTC, their last completion day
+    # is its UTC date
+    user = sa.table('user', sa.column('last_completed_date', sa.DateTime()), sa.column('last_completed_day', sa.Date()))
+    op.execute(
+        user.update()
+        .where(user.c.last_completed_date.isnot(None))
+        .where(user.c.last_completed_day.is_(None))
+        .values(last_completed_day=sa.func.date(user.c.last_completed_date))
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_timezone_utc_offset')
+        batch_op.drop_index('ix_user_utc_offset_last_completed_day')
+        batch_op.drop_column('last_completed_day')
+        batch_op.drop_column('utc_offset')
+        batch_op.drop_column('timezone')
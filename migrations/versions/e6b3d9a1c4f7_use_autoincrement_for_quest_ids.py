@@ -0,0 +1,42 @@
+"""Use AUTOINCREMENT for quest ids
+
+Revision ID: e6b3d9a1c4f7
+Revises: d5a2f8c3e9b1
+Create Date: 2026-10-19 10:42:17.630245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3d9a1c4f7'
+down_revision = 'd5a2f8c3e9b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite reuses the largest rowid once it is deleted, archived quests'
+    # ids came back for new quests. Other databases use sequences.
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('quest', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+    # Start after the ids already archived in this database
+    last_ids = [bind.execute(sa.text('SELECT MAX(id) FROM quest')).scalar() or 0]
+    if sa.inspect(bind).has_table('archived_quest'):
+        last_ids.append(bind.execute(sa.text('SELECT MAX(id) FROM archived_quest')).scalar() or 0)
+    bind.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'quest'"))
+    bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('quest', :seq)"), {'seq': max(last_ids)})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('quest', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -0,0 +1,41 @@
+"""Add description cache table
+
+Revision ID: e9a3c7f1d5b4
+Revises: d2f6b8c4a7e3
+Create Date: 2026-10-18 13:58:20.418736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a3c7f1d5b4'
+down_revision = 'd2f6b8c4a7e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table may already exist, from `flask init-db` or an older deployment
+    # that ran db.create_all() on import
+    if sa.inspect(op.get_bind()).has_table('description_cache_entry'):
+        return
+    op.create_table('description_cache_entry',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.Column('hits', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('description_cache_entry', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_description_cache_entry_last_used_at'), ['last_used_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('description_cache_entry', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_description_cache_entry_last_used_at'))
+
+    op.drop_table('description_cache_entry')
@@ -0,0 +1,108 @@
+"""Add points ledger and rollups
+
+Revision ID: f3b8d1e6a2c7
+Revises: e9a3c7f1d5b4
+Create Date: 2026-10-18 15:12:44.730215
+
+"""
+from datetime import timedelta
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1e6a2c7'
+down_revision = 'e9a3c7f1d5b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    # The tables may already exist, from `flask init-db` or an older deployment
+    # that ran db.create_all() on import
+    if not inspector.has_table('points_ledger_entry'):
+        op.create_table('points_ledger_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('quest_id', sa.Integer(), nullable=True),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('points', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_points_ledger_entry_user_created_at', 'points_ledger_entry', ['user_id', 'created_at'], unique=False)
+    if not inspector.has_table('points_rollup'):
+        op.create_table('points_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('points', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'period', 'period_start')
+        )
+
+    # Backfill from the completed quests, the only rewards recorded so far
+    if bind.execute(sa.text('SELECT 1 FROM points_ledger_entry LIMIT 1')).first():
+        return
+    ledger = sa.table('points_ledger_entry',
+        sa.column('user_id', sa.Integer),
+        sa.column('quest_id', sa.Integer),
+        sa.column('category', sa.String),
+        sa.column('points', sa.Integer),
+        sa.column('created_at', sa.DateTime)
+    )
+    rollup = sa.table('points_rollup',
+        sa.column('user_id', sa.Integer),
+        sa.column('period', sa.String),
+        sa.column('period_start', sa.Date),
+        sa.column('points', sa.Integer)
+    )
+    quest = sa.table('quest',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('tags', sa.Text),
+        sa.column('kind', sa.String),
+        sa.column('reward', sa.Integer),
+        sa.column('completed', sa.Boolean),
+        sa.column('completion_date', sa.DateTime)
+    )
+    entries = []
+    totals = {}
+    completed = sa.select(quest).where(quest.c.completed == sa.true(), quest.c.completion_date.isnot(None))
+    for row in bind.execute(completed):
+        # A legacy row with malformed tags still gets its ledger entry
+        try:
+            tags = json.loads(row.tags or '[]')
+        except (json.JSONDecodeError, TypeError):
+            tags = []
+        if not isinstance(tags, list):
+            tags = []
+        entries.append({
+            'user_id': row.user_id,
+            'quest_id': row.id,
+            'category': tags[0] if tags else row.kind,
+            'points': row.reward,
+            'created_at': row.completion_date
+        })
+        day = row.completion_date.date()
+        starts = {'day': day, 'week': day - timedelta(days=day.weekday()), 'month': day.replace(day=1)}
+        for period, start in starts.items():
+            key = (row.user_id, period, start)
+            totals[key] = totals.get(key, 0) + row.reward
+    if entries:
+        op.bulk_insert(ledger, entries)
+        op.bulk_insert(rollup, [
+            {'user_id': user_id, 'period': period, 'period_start': start, 'points': points}
+            for (user_id, period, start), points in totals.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('points_rollup')
+    op.drop_index('ix_points_ledger_entry_user_created_at', table_name='points_ledger_entry')
+    op.drop_table('points_ledger_entry')
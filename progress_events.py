@@ -0,0 +1,147 @@
+import json
+import queue
+import threading
+import time
+
+# Events a slow stream may fall behind by before new ones are dropped for it
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """The events of one user for one open stream"""
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout):
+        """(event, data) of the next event, None if none came within timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class ProgressBroker:
+    """
+    Per-user channels of progress events (points, level ups, achievements),
+    pushed to the user's open streams.
+
+    Streams subscribe in the worker serving them. publish() hands an event to
+    the backend, which delivers it to the user's subscriptions in every
+    worker it reaches; dispatch() delivers to the ones of this worker.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def dispatch(self, user_id, event, data):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait((event, data))
+            except queue.Full:
+                # The page is not reading, it gets the state on its next load
+                pass
+
+    def publish(self, user_id, event, data):
+        raise NotImplementedError
+
+
+class MemoryProgressBroker(ProgressBroker):
+    """
+    Events stay in the worker that published them: a stream only sees the
+    completions handled by its own worker. Fine with a single worker.
+    """
+
+    name = 'memory'
+
+    def publish(self, user_id, event, data):
+        self.dispatch(user_id, event, data)
+
+
+class RedisProgressBroker(ProgressBroker):
+    """
+    Events go through Redis pub/sub, one channel per user, so a stream sees
+    the completions of every worker. Each worker runs one listener thread on
+    all the channels, started with its first stream. The redis client is
+    imported on first use.
+    """
+
+    name = 'redis'
+
+    # Seconds to wait before listening again after the connection was lost
+    RECONNECT_DELAY = 1
+
+    def __init__(self, url, prefix='progress:'):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._listener = None
+        self._client_lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import redis
+                    self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, user_id, event, data):
+        self._get_client().publish(self.prefix + str(user_id), json.dumps({'event': event, 'data': data}))
+
+    def subscribe(self, user_id):
+        # Started here rather than in __init__: the app is imported before
+        # gunicorn forks and threads don't survive the fork
+        with self._client_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='progress-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    user_id = int(message['channel'][len(self.prefix):])
+                    payload = json.loads(message['data'])
+                    self.dispatch(user_id, payload['event'], payload['data'])
+            except Exception as e:
+                print(f"Progress listener error: {str(e)}")
+                time.sleep(self.RECONNECT_DELAY)
+
+
+def create_progress_broker(config):
+    """Build the broker selected by PROGRESS_BACKEND ('memory' or 'redis')"""
+    backend = config.get('PROGRESS_BACKEND', 'memory')
+    if backend == 'memory':
+        return MemoryProgressBroker()
+    if backend == 'redis':
+        return RedisProgressBroker(config.get('PROGRESS_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f'Unknown progress backend: {backend}')
@@ -0,0 +1,193 @@
+import csv
+from datetime import datetime
+import io
+import json
+import re
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Columns of an export, also the fields an import understands
+EXPORT_FIELDS = ['id', 'name', 'description', 'tags', 'duration', 'difficulty', 'reward', 'priority',
+                 'target', 'unit', 'due_date', 'created_at', 'completed', 'completion_date', 'kind']
+
+DIFFICULTIES = {'easy': 'Easy', 'medium': 'Medium', 'hard': 'Hard'}
+
+# Other spellings of the fields, e.g. the quest_name of instance/task.json
+FIELD_ALIASES = {'quest_name': 'name', 'title': 'name'}
+
+
+def detect_format(filename=None, content_type=None):
+    """Guess the import format from a file name or content type, None if unknown"""
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in ('jsonl', 'ndjson'):
+            return 'jsonl'
+        if extension == 'csv':
+            return 'csv'
+    if content_type:
+        if 'csv' in content_type:
+            return 'csv'
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            return 'jsonl'
+    return None
+
+
+def decode_lines(stream):
+    """
+    Decode a binary stream line by line as UTF-8, dropping a leading BOM. Line
+    endings are kept, as the csv module expects.
+    """
+    for index, line in enumerate(stream):
+        text = line.decode('utf-8')
+        yield text.lstrip('\ufeff') if index == 0 else text
+
+
+def iter_records(stream, fmt):
+    """
+    Yield (line, record, error) from text lines, one record at a time.
+    line is the 1-based line number in the file, record a dict or None when
+    the line could not be parsed, error the reason.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except json.JSONDecodeError as e:
+                yield line, None, f'Invalid JSON: {e.msg}'
+                continue
+            if not isinstance(record, dict):
+                yield line, None, 'Expected a JSON object'
+                continue
+            yield line, record, None
+    else:
+        raise ValueError(f'Unknown format: {fmt}')
+
+
+def _int(record, field, default=None, minimum=None, maximum=None):
+    value = record.get(field)
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        # '10 minutes' -> 10, but not '1.5' -> 1
+        match = re.match(r'\s*(-?\d+)(?![.\d])', value)
+        if not match:
+            raise ValueError(f'{field} must be an integer')
+        value = int(match.group(1))
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f'{field} must be an integer')
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f'{field} must be between {minimum} and {maximum}')
+    return value
+
+
+def _str(record, field):
+    """A text field, None when missing or empty"""
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    return value
+
+
+def _tags(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    value = str(value)
+    if value.startswith('['):
+        try:
+            return _tags(json.loads(value))
+        except json.JSONDecodeError:
+            pass
+    return [tag.strip() for tag in value.split(',') if tag.strip()]
+
+
+def quest_values(record):
+    """
+    Validate an import record and convert it to quest column values. Imported
+    quests are always open: id, created_at and completion fields are ignored.
+    Returns:
+        dict of column values, with tags as a list
+    Raises:
+        ValueError: If a field is missing or invalid
+    """
+    record = {FIELD_ALIASES.get(key, key): value for key, value in record.items() if key is not None}
+
+    name = (_str(record, 'name') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    if len(name) > 200:
+        raise ValueError('name is longer than 200 characters')
+
+    reward = _int(record, 'reward', minimum=0)
+    if reward is None:
+        raise ValueError('reward is required')
+
+    difficulty = DIFFICULTIES.get(str(record.get('difficulty') or 'medium').strip().lower())
+    if difficulty is None:
+        raise ValueError('difficulty must be Easy, Medium or Hard')
+
+    due_date = _str(record, 'due_date')
+    if due_date is not None:
+        try:
+            due_date = datetime.fromisoformat(due_date)
+        except ValueError:
+            raise ValueError('due_date must be an ISO 8601 date')
+
+    return {
+        'name': name,
+        'description': _str(record, 'description'),
+        'tags': _tags(record.get('tags')),
+        'duration': _int(record, 'duration', default=30, minimum=0),
+        'difficulty': difficulty,
+        'reward': reward,
+        'priority': _int(record, 'priority', default=1, minimum=1, maximum=5),
+        'target': _int(record, 'target'),
+        'unit': _str(record, 'unit'),
+        'due_date': due_date,
+    }
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_lines(rows, fmt):
+    """
+    Yield the lines of an export from an iterable of EXPORT_FIELDS tuples,
+    with tags as the stored JSON string
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            writer.writerow([_export_value(value) for value in row])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # The header of an empty export
+        if buffer.tell():
+            yield buffer.getvalue()
+    elif fmt == 'jsonl':
+        for row in rows:
+            record = dict(zip(EXPORT_FIELDS, (_export_value(value) for value in row)))
+            try:
+                record['tags'] = json.loads(record['tags'] or '[]')
+            except json.JSONDecodeError:
+                record['tags'] = []
+            yield json.dumps(record) + '\n'
+    else:
+        raise ValueError(f'Unknown format: {fmt}')
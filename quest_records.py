@@ -0,0 +1,71 @@
+from functools import lru_cache
+import json
+
+# Columns read into a QuestRecord, in order
+QUEST_RECORD_FIELDS = ('id', 'name', 'description', 'tags', 'duration', 'difficulty', 'reward', 'completed',
+                       'completion_date', 'created_at', 'due_date', 'priority', 'target', 'unit', 'kind')
+
+
+def format_datetime(value):
+    """'YYYY-MM-DD HH:MM:SS' as in the API, None stays None"""
+    return value.isoformat(' ', 'seconds') if value is not None else None
+
+
+def decode_tags(value):
+    """Tags stored as a JSON string as a list"""
+    return list(decode_tags_cached(value))
+
+
+@lru_cache(maxsize=4096)
+def decode_tags_cached(value):
+    """
+    Tags stored as a JSON string as a tuple, shared by every row with the
+    same tags (most rows repeat a few combinations, like the daily quests')
+    """
+    if not value or value == '[]':
+        return ()
+    try:
+        tags = json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return ()
+    return tuple(tags) if isinstance(tags, list) else ()
+
+
+class QuestRecord:
+    """
+    Read-only quest row for list views, built from a column-only select
+    (see QUEST_RECORD_FIELDS) without the ORM. Tags are decoded when the
+    record is built, into a tuple shared with the other rows with the same
+    tags. Templates and JSON responses use it like a Quest.
+    """
+
+    __slots__ = QUEST_RECORD_FIELDS
+
+    def __init__(self, row):
+        (self.id, self.name, self.description, tags, self.duration, self.difficulty, self.reward,
+         self.completed, self.completion_date, self.created_at, self.due_date, self.priority,
+         self.target, self.unit, self.kind) = row
+        self.tags = decode_tags_cached(tags)
+
+    def get_tags(self):
+        return self.tags
+
+    def to_dict(self):
+        """Same keys and formats as Quest.to_dict"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description or '',
+            'tags': list(self.tags),
+            'duration': self.duration,
+            'difficulty': self.difficulty,
+            'reward': self.reward,
+            'completed': self.completed,
+            'completion_date': format_datetime(self.completion_date),
+            'created_at': format_datetime(self.created_at),
+            'due_date': format_datetime(self.due_date),
+            'priority': self.priority,
+            'target': self.target,
+            'unit': self.unit,
+            'kind': self.kind
+        }
@@ -0,0 +1,59 @@
+import os
+
+from sqlalchemy import event
+
+# Applied to every new SQLite connection. WAL lets readers run while a writer
+# commits, busy_timeout makes writers wait for the lock instead of failing
+# with "database is locked", and synchronous=NORMAL is durable in WAL mode.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # ms
+    'cache_size': -64000,       # negative means KiB, so 64 MB per connection
+    'mmap_size': 268435456,     # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+def database_uri(basedir):
+    """
+    DATABASE_URL if set (e.g. a PostgreSQL server), otherwise the SQLite file
+    at SQLITE_PATH (default data/tasks.db)
+    """
+    url = os.getenv('DATABASE_URL')
+    if url:
+        # Heroku/Render style URLs use the scheme SQLAlchemy dropped
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        return url
+    return 'sqlite:///' + os.path.join(basedir, os.getenv('SQLITE_PATH', 'data/tasks.db'))
+
+
+def engine_options(uri):
+    """Pool settings for SQLALCHEMY_ENGINE_OPTIONS, tunable through DB_POOL_* variables"""
+    options = {
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    if uri.startswith('sqlite'):
+        options['connect_args'] = {'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000}
+        if ':memory:' in uri or uri in ('sqlite://', 'sqlite:///'):
+            return options
+    options['pool_size'] = int(os.getenv('DB_POOL_SIZE', 5))
+    options['max_overflow'] = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    options['pool_timeout'] = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    return options
+
+
+def install_sqlite_pragmas(engine, pragmas=None):
+    """Run the PRAGMA statements on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
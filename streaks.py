@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = 'UTC'
+
+# Offsets are whole quarter hours in every IANA zone, a job checking streaks
+# this often sees every local midnight
+DECAY_INTERVAL_MINUTES = 15
+
+
+def validate_timezone(name):
+    """
+    The IANA timezone name, e.g. 'Europe/Paris'
+    Raises:
+        ValueError: If the timezone is not known
+    """
+    if not isinstance(name, str) or not name or len(name) > 64:
+        raise ValueError('timezone must be an IANA timezone name')
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Unknown timezone: {name}')
+    return name
+
+
+def utc_offset_minutes(name, moment=None):
+    """
+    Offset of a timezone from UTC in minutes at a naive UTC moment (default
+    now). Stored on the user, so day boundaries are a plain addition in
+    Python and SQL; refreshed by the decay job when DST starts or ends.
+    """
+    moment = moment or datetime.utcnow()
+    offset = moment.replace(tzinfo=dt_timezone.utc).astimezone(ZoneInfo(name)).utcoffset()
+    return int(offset.total_seconds() // 60)
+
+
+def local_date(moment, offset):
+    """Local date of a naive UTC moment for a UTC offset in minutes"""
+    return (moment + timedelta(minutes=offset or 0)).date()
+
+
+def decay_cutoffs(offsets, now=None):
+    """
+    {offset: local yesterday} for UTC offsets in minutes. A streak whose last
+    completion day is before its cutoff missed a whole local day and is broken.
+    """
+    now = now or datetime.utcnow()
+    return {offset: local_date(now, offset) - timedelta(days=1) for offset in offsets}